@@ -0,0 +1,347 @@
+"""项目镜像同步器性能基准
+
+在本地启动一个模拟远程站点的 HTTP 服务（独立子进程），生成包含 N 个文件的
+项目树（HTML 中带有 LiveReload 注入脚本），依次测量冷启动、部分变化、
+无变化三种场景下 test_connection / sync_project(auto_detect=True) /
+check_updates 的耗时，并输出机器可读的 JSON 结果。
+
+用法:
+    python3 bench_sync.py --files 500 --workers 4 --output bench.json
+    python3 bench_sync.py --files 200 --workers 4 --clean-processes 2 --html-kb 64
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from script import ProjectMirrorSync
+
+
+LIVERELOAD_SNIPPET = (
+    "<script>document.write('<script src=\"http://' + (location.host || 'localhost')"
+    ".split(':')[0] + ':35729/livereload.js?snipver=1\"></' + 'script>')</script>\n"
+    "<script>\n    document.addEventListener('LiveReloadDisconnect', function() "
+    "{ setTimeout(function(){ location.reload() }, 1000) })</script>\n"
+)
+STATS_PATH = '/__bench_stats'
+
+
+# ============================================================================
+# 模拟远程站点
+# ============================================================================
+
+def generate_tree(root, file_count, seed=0, html_kb=0):
+    """生成测试项目树，返回相对路径列表"""
+    rnd = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(max(1, file_count - 1)):
+        kind = rnd.choice(('html', 'css', 'js', 'img', 'img'))
+        if kind == 'html':
+            rel = f"pages/page{i}.html"
+        elif kind == 'css':
+            rel = f"css/style{i}.css"
+        elif kind == 'js':
+            rel = f"js/app{i}.js"
+        else:
+            rel = f"img/pic{i}.jpg"
+        write_asset(root / rel, kind, rnd, html_kb=html_kb)
+        paths.append(rel)
+    write_asset(root / 'index.html', 'html', rnd, html_kb=html_kb)
+    return ['index.html'] + paths
+
+
+def write_asset(path, kind, rnd, revision=0, html_kb=0):
+    """写入一个指定类型的测试文件；html_kb 为 HTML 页面的最小大小（KB）"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if kind == 'html':
+        lines = [f"    <p>段落 {n} 修订 {revision}</p>\n" for n in range(rnd.randint(20, 200))]
+        size = sum(len(line.encode('utf-8')) for line in lines)
+        while size < html_kb * 1024:
+            lines.append(f"    <p>段落 {len(lines)} 修订 {revision}</p>\n")
+            size += len(lines[-1].encode('utf-8'))
+        paragraphs = ''.join(lines)
+        content = ("<!DOCTYPE html>\n<html>\n<head>\n    <title>bench</title>\n"
+                   "    <link rel=\"stylesheet\" href=\"../css/base.css\">\n</head>\n<body>\n"
+                   f"{paragraphs}</body>\n{LIVERELOAD_SNIPPET}</html>\n").encode('utf-8')
+    elif kind == 'css':
+        content = ''.join(f".c{n}{{margin:{n}px;color:#{revision:06x}}}\n"
+                          for n in range(rnd.randint(50, 500))).encode('utf-8')
+    elif kind == 'js':
+        content = ''.join(f"function f{n}(){{return {n + revision};}}\n"
+                          for n in range(rnd.randint(50, 500))).encode('utf-8')
+    else:
+        content = rnd.randbytes(rnd.randint(20, 200) * 1024)
+    path.write_bytes(content)
+
+
+def kind_of(rel):
+    if rel.endswith('.html'):
+        return 'html'
+    if rel.endswith('.css'):
+        return 'css'
+    if rel.endswith('.js'):
+        return 'js'
+    return 'img'
+
+
+class BenchHandler(SimpleHTTPRequestHandler):
+    """统计发送字节数的静态文件处理器，支持 HTTP/1.1 长连接"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    lock = threading.Lock()
+    counters = {'requests': 0, 'bytes': 0}
+
+    def do_GET(self):
+        if self.path == STATS_PATH:
+            with self.lock:
+                body = json.dumps(self.counters).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        with self.lock:
+            self.counters['requests'] += 1
+        super().do_GET()
+
+    def copyfile(self, source, outputfile):
+        while True:
+            chunk = source.read(64 * 1024)
+            if not chunk:
+                break
+            outputfile.write(chunk)
+            with self.lock:
+                self.counters['bytes'] += len(chunk)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(root, port_queue):
+    """子进程入口：在随机端口上提供 root 目录"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(BenchHandler, directory=str(root)))
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def server_stats(syncer, base_url):
+    result = syncer.fetch(base_url + STATS_PATH)
+    return json.loads(result[2]) if result else {'requests': 0, 'bytes': 0}
+
+
+# ============================================================================
+# 测量
+# ============================================================================
+
+class CleanHtmlTimer:
+    """包装 clean_html，累计各线程在净化上消耗的CPU时间
+
+    交给进程池的页面不经过 clean_html，其子进程CPU时间从同步器的
+    clean_offloaded / clean_offloaded_cpu_seconds 计数器取增量。
+    """
+
+    def __init__(self, syncer):
+        self.cpu = 0.0
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.metrics = syncer.metrics
+        self.offloaded = self.offloaded_counters()
+        self.clean_html = syncer.clean_html
+        syncer.clean_html = self
+
+    def offloaded_counters(self):
+        counters = self.metrics.snapshot()['counters']
+        return counters.get('clean_offloaded', 0), counters.get('clean_offloaded_cpu_seconds', 0.0)
+
+    def stop(self, syncer):
+        """恢复 clean_html，返回 (子进程净化次数, 子进程CPU秒数)"""
+        syncer.clean_html = self.clean_html
+        calls, cpu = self.offloaded_counters()
+        return calls - self.offloaded[0], cpu - self.offloaded[1]
+
+    def __call__(self, content):
+        start = time.thread_time()
+        try:
+            return self.clean_html(content)
+        finally:
+            elapsed = time.thread_time() - start
+            with self.lock:
+                self.cpu += elapsed
+                self.calls += 1
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def measure(syncer, base_url, name, call, file_count, verbose):
+    """执行一个阶段并返回该阶段的指标"""
+    timer = CleanHtmlTimer(syncer)
+    before = server_stats(syncer, base_url)
+    with open(os.devnull, 'w') as devnull:
+        sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(devnull)
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        with sink:
+            call()
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+    offloaded_calls, offloaded_cpu = timer.stop(syncer)
+    after = server_stats(syncer, base_url)
+
+    transferred = after['bytes'] - before['bytes']
+    return {
+        'phase': name,
+        'seconds': round(elapsed, 6),
+        'cpu_seconds': round(cpu, 6),
+        'requests': after['requests'] - before['requests'],
+        'bytes': transferred,
+        'files_per_s': round(file_count / elapsed, 2) if elapsed else None,
+        'bytes_per_s': round(transferred / elapsed, 2) if elapsed else None,
+        'clean_html_calls': timer.calls + offloaded_calls,
+        'clean_html_cpu_seconds': round(timer.cpu + offloaded_cpu, 6),
+        'clean_html_offloaded_calls': offloaded_calls,
+        'clean_html_offloaded_cpu_seconds': round(offloaded_cpu, 6),
+        'stats': dict(syncer.stats),
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def run_scenario(name, base_url, local_path, options, file_count, verbose):
+    """新建同步器（从磁盘加载状态）并依次测量三个阶段"""
+    syncer = ProjectMirrorSync(base_url, local_path, **options)
+    try:
+        phases = [
+            measure(syncer, base_url, 'test_connection', syncer.test_connection, 1, verbose),
+            measure(syncer, base_url, 'sync_project',
+                    lambda: syncer.sync_project(auto_detect=True), file_count, verbose),
+            measure(syncer, base_url, 'check_updates', syncer.check_updates, 1, verbose),
+        ]
+    finally:
+        syncer.close()
+    return {'scenario': name, 'phases': phases, 'metrics': syncer.metrics.snapshot()}
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=Path(__file__).parent, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(args):
+    work = Path(tempfile.mkdtemp(prefix='mirror_bench_'))
+    remote = work / 'remote'
+    local = work / 'local'
+    rnd = random.Random(args.seed + 1)
+    paths = generate_tree(remote, args.files, args.seed, args.html_kb)
+
+    # 冷启动：本地只有占位文件，供 auto_detect 发现路径，全部内容需要下载
+    for rel in paths:
+        (local / rel).parent.mkdir(parents=True, exist_ok=True)
+        (local / rel).write_bytes(b'stale')
+
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(remote, port_queue), daemon=True)
+    server.start()
+    base_url = f"http://127.0.0.1:{port_queue.get(timeout=10)}"
+    options = {'workers': args.workers, 'clean_processes': args.clean_processes}
+
+    results = []
+    try:
+        results.append(run_scenario('cold', base_url, local, options, len(paths), args.verbose))
+
+        # 部分变化：修改一部分远程文件；保证修改时间跨过秒级精度
+        time.sleep(1.1)
+        changed = rnd.sample(paths, max(1, int(len(paths) * args.change_ratio)))
+        for rel in changed:
+            write_asset(remote / rel, kind_of(rel), rnd, revision=1, html_kb=args.html_kb)
+        result = run_scenario('warm', base_url, local, options, len(paths), args.verbose)
+        result['changed_files'] = len(changed)
+        results.append(result)
+
+        results.append(run_scenario('no_change', base_url, local, options, len(paths), args.verbose))
+    finally:
+        server.terminate()
+        server.join()
+        if not args.keep:
+            shutil.rmtree(work, ignore_errors=True)
+
+    return {
+        'benchmark': 'mirror_sync',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {'files': len(paths), 'workers': args.workers,
+                   'clean_processes': args.clean_processes, 'html_kb': args.html_kb,
+                   'change_ratio': args.change_ratio, 'seed': args.seed},
+        'results': results,
+    }
+
+
+def print_summary(report):
+    print(f"\n{'=' * 70}")
+    print(f"📊 同步基准 ({report['params']['files']} 个文件, {report['params']['workers']} 个工作线程)")
+    print(f"{'=' * 70}")
+    for result in report['results']:
+        for phase in result['phases']:
+            print(f"  {result['scenario']:<10} {phase['phase']:<16} {phase['seconds']:>9.3f}s "
+                  f"{phase['files_per_s'] or 0:>10.1f} 文件/s {phase['bytes_per_s'] or 0:>14.0f} B/s "
+                  f"净化CPU {phase['clean_html_cpu_seconds']:.3f}s")
+    print(f"  峰值RSS: {report['results'][-1]['phases'][-1]['peak_rss_kb']} KB")
+    print(f"{'=' * 70}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='项目镜像同步器性能基准')
+    parser.add_argument('--files', type=int, default=500, help='生成的文件数量')
+    parser.add_argument('--workers', type=int, default=1, help='同步工作线程数')
+    parser.add_argument('--clean-processes', type=int, default=0,
+                        help='净化与哈希使用的进程数（0 为线程内处理）')
+    parser.add_argument('--html-kb', type=int, default=0,
+                        help='HTML 页面的最小大小（KB），超过 32 KB 时启用的净化进程池才会接手')
+    parser.add_argument('--change-ratio', type=float, default=0.1, help='warm 场景中修改的文件比例')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--output', help='JSON 结果输出文件（默认输出到标准输出）')
+    parser.add_argument('--keep', action='store_true', help='保留临时目录')
+    parser.add_argument('--verbose', action='store_true', help='显示同步器的逐文件输出')
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    print_summary(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 结果已保存到: {args.output}")
+    else:
+        print(json.dumps(report, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
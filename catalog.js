@@ -111,20 +111,95 @@ function openProject(path) {
     }
 }
 
+// 预生成的源码包与搜索索引（由 update_catalog.py 生成），缺失时退回逐个请求文件与线性过滤
+const CATALOG_DATA = 'catalog-data';
+const bundleRequests = {};
+let searchIndex = null;
+
+function loadBundle(projectId) {
+    if (!(projectId in bundleRequests)) {
+        bundleRequests[projectId] = fetch(`${CATALOG_DATA}/bundles/${encodeURIComponent(projectId)}.json`)
+            .then(response => response.ok ? response.json() : null)
+            .catch(() => null);
+    }
+    return bundleRequests[projectId];
+}
+
+function loadSearchIndex() {
+    return fetch(`${CATALOG_DATA}/search-index.json`)
+        .then(response => response.ok ? response.json() : null)
+        .then(index => {
+            if (index && index.version === 1) searchIndex = index;
+        })
+        .catch(() => {});
+}
+
+// 与 update_catalog.py 的 tokenize 一致：ASCII 按单词，中文按相邻两字（外加末字）
+function tokenize(text) {
+    const terms = [];
+    for (const token of text.toLowerCase().match(/[a-z0-9_$]+|[\u4e00-\u9fff]+/g) || []) {
+        if (token[0] < '\u4e00') {
+            terms.push(token);
+        } else {
+            for (let i = 0; i < token.length - 1; i++) terms.push(token.slice(i, i + 2));
+            terms.push(token[token.length - 1]);
+        }
+    }
+    return terms;
+}
+
+// 在排好序的索引词中二分查找，返回以 prefix 开头的词对应的项目序号集合
+function lookupPrefix(prefix) {
+    const terms = searchIndex.terms;
+    let lo = 0, hi = terms.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (terms[mid] < prefix) lo = mid + 1; else hi = mid;
+    }
+    const matches = new Set();
+    for (let i = lo; i < terms.length && terms[i].startsWith(prefix); i++) {
+        searchIndex.postings[i].forEach(n => matches.add(n));
+    }
+    return matches;
+}
+
+function searchProjects(searchTerm) {
+    // 名称、描述、ID 的子串匹配与原来一致
+    const matched = new Set(projects.filter(project => 
+        project.name.toLowerCase().includes(searchTerm) ||
+        project.description.toLowerCase().includes(searchTerm) ||
+        project.id.toLowerCase().includes(searchTerm)
+    ).map(project => project.id));
+    
+    // 索引额外匹配文件内容：每个搜索词都要命中某个索引词的前缀
+    const terms = tokenize(searchTerm);
+    if (searchIndex && terms.length > 0) {
+        let hits = null;
+        for (const term of terms) {
+            const found = lookupPrefix(term);
+            hits = hits ? new Set([...hits].filter(n => found.has(n))) : found;
+            if (hits.size === 0) break;
+        }
+        hits.forEach(n => matched.add(searchIndex.projects[n]));
+    }
+    
+    return projects.filter(project => matched.has(project.id));
+}
+
 // 搜索功能
 function setupSearch() {
     const searchInput = document.getElementById('searchInput');
     
     searchInput.addEventListener('input', (e) => {
         const searchTerm = e.target.value.toLowerCase();
-        
-        const filtered = projects.filter(project => 
-            project.name.toLowerCase().includes(searchTerm) ||
-            project.description.toLowerCase().includes(searchTerm) ||
-            project.id.toLowerCase().includes(searchTerm)
-        );
-        
-        renderProjects(filtered);
+        renderProjects(searchProjects(searchTerm));
+    });
+    
+    // 后台加载索引，加载完成后按当前输入重新过滤
+    loadSearchIndex().then(() => {
+        if (searchIndex && searchInput.value) {
+            renderProjects(searchProjects(searchInput.value.toLowerCase()));
+        }
     });
 }
 
@@ -230,6 +305,9 @@ function viewCode(projectId) {
         </button>
     `).join('');
     
+    // 一次请求取回整个项目的源码包，切换文件不再发请求
+    loadBundle(project.id);
+    
     // Load first file
     if (htmlFiles.length > 0) {
         loadFile(project.id, htmlFiles[0]);
@@ -253,13 +331,20 @@ async function loadFile(projectId, fileName) {
     });
     
     try {
-        // Construct file path
-        let filePath = project.path.substring(0, project.path.lastIndexOf('/') + 1) + fileName;
-        
-        const response = await fetch(filePath);
-        if (!response.ok) throw new Error('Failed to load file');
-        
-        const code = await response.text();
+        let code;
+        const bundle = await loadBundle(projectId);
+        const entry = bundle && bundle.files.find(f => f.name === fileName);
+        if (entry) {
+            code = bundle.content.substr(entry.offset, entry.length);
+        } else {
+            // 源码包中没有该文件（未生成或文件过大）时单独请求
+            let filePath = project.path.substring(0, project.path.lastIndexOf('/') + 1) + fileName;
+            
+            const response = await fetch(filePath);
+            if (!response.ok) throw new Error('Failed to load file');
+            
+            code = await response.text();
+        }
         
         // Determine language for syntax highlighting
         let language = 'markup';
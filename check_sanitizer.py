@@ -0,0 +1,128 @@
+"""HTML净化器回归检查
+
+用 sanitizer_corpus.json 中的注入片段与特殊用例构造回归语料：仓库内每个 HTML
+页面分别在 </head> 前、</body> 前、</body> 后插入每种注入脚本，再加上 CRLF、
+多余空行、缺少 </html> 等手写用例。逐个对比 HtmlSanitizer 与旧版正则链
+clean_html 的输出，要求逐字节一致。
+
+deviations 中是有意的行为差异：旧正则会跨 <script> 块匹配，把注入脚本前面的
+正常脚本一起删掉；新实现保留它。这些用例与记录的期望输出对比。
+
+用法:
+    python3 check_sanitizer.py
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+from script import HtmlSanitizer
+
+
+BASE_PATH = Path(__file__).resolve().parent
+CORPUS_FILE = BASE_PATH / 'sanitizer_corpus.json'
+EXCLUDE_DIRS = {'.git', 'node_modules', '__pycache__'}
+
+
+def legacy_clean_html(content):
+    """旧版 clean_html（正则链实现），作为对比基线"""
+    text = content.decode('utf-8', errors='ignore')
+    html_end = text.find('</html>')
+    if html_end != -1:
+        html_end_tag = html_end + len('</html>')
+        text = text[:html_end_tag]
+
+    text = re.sub(
+        r'(</body>\s*)<script>.*?livereload.*?</script>\s*(<script>.*?</script>\s*)*\s*(</html>)',
+        r'\1\3',
+        text,
+        flags=re.DOTALL | re.IGNORECASE
+    )
+
+    patterns = [
+        r'<script>document\.write\(.*?livereload\.js.*?\)</script>',
+        r'<script>\s*document\.addEventListener\(.*?LiveReloadDisconnect.*?\)</script>',
+        r'<script>\s*class\s+reloadPlugin.*?</script>',
+        r'<script[^>]*src=["\'][^"\']*livereload\.js[^"\']*["\'][^>]*></script>',
+        r'<script[^>]*src=["\'][^"\']*:35929[^"\']*["\'][^>]*></script>',
+    ]
+
+    for pattern in patterns:
+        text = re.sub(pattern, '', text, flags=re.DOTALL | re.IGNORECASE)
+
+    text = re.sub(r'(</html>).*$', r'\1', text, flags=re.DOTALL)
+    text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)
+    text = text.strip()
+    if not text.endswith('</html>'):
+        text += '\n</html>'
+
+    return text.encode('utf-8')
+
+
+def repo_pages(base_path):
+    """收集仓库内的 HTML 页面"""
+    pages = {}
+    for path in sorted(base_path.rglob('*.html')):
+        if EXCLUDE_DIRS.isdisjoint(path.relative_to(base_path).parts):
+            pages[path.relative_to(base_path).as_posix()] = path.read_text(encoding='utf-8',
+                                                                            errors='ignore')
+    return pages
+
+
+def build_corpus(corpus, pages):
+    """由仓库页面与注入片段生成 (名称, 文档) 列表"""
+    documents = []
+    for page_name, page in pages.items():
+        documents.append((page_name, page))
+        for name, snippet in corpus['injections'].items():
+            documents.append((f"{page_name} +{name} </head>", page.replace('</head>', snippet + '\n</head>', 1)))
+            documents.append((f"{page_name} +{name} <body>", page.replace('</body>', snippet + '\n</body>', 1)))
+            documents.append((f"{page_name} +{name} </body>", page.replace('</body>', '</body>\n' + snippet + '\n', 1)))
+        documents.append((f"{page_name} +all </body>",
+                          page.replace('</body>', '</body>\n' + '\n'.join(corpus['injections'].values()), 1)))
+    documents.extend(corpus['cases'].items())
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比 HtmlSanitizer 与旧版 clean_html 的输出')
+    parser.add_argument('--corpus', default=str(CORPUS_FILE), help='语料文件')
+    parser.add_argument('-v', '--verbose', action='store_true', help='显示每个差异的输出')
+    args = parser.parse_args()
+
+    corpus = json.loads(Path(args.corpus).read_text(encoding='utf-8'))
+    sanitizer = HtmlSanitizer()
+    failures = []
+
+    documents = build_corpus(corpus, repo_pages(BASE_PATH))
+    for name, document in documents:
+        content = document.encode('utf-8')
+        expected, actual = legacy_clean_html(content), sanitizer.clean(content)
+        if expected != actual:
+            failures.append((name, expected, actual))
+
+    for name, case in corpus['deviations'].items():
+        content = case['input'].encode('utf-8')
+        expected, actual = case['expected'].encode('utf-8'), sanitizer.clean(content)
+        if expected != actual:
+            failures.append((f"deviation {name}", expected, actual))
+        elif legacy_clean_html(content) == actual:
+            print(f"ℹ️ {name}: 旧实现输出已与新实现一致，该差异用例可移除")
+
+    total = len(documents) + len(corpus['deviations'])
+    for name, expected, actual in failures:
+        print(f"❌ {name}")
+        if args.verbose:
+            print(f"   期望: {expected[-300:]!r}")
+            print(f"   实际: {actual[-300:]!r}")
+    if failures:
+        print(f"❌ {len(failures)}/{total} 个用例输出不一致")
+        return 1
+    print(f"✅ {total} 个用例全部一致（其中有意差异 {len(corpus['deviations'])} 个）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,159 +1,1583 @@
-import urllib.request
+import argparse
+import base64
 import urllib.error
+import urllib.request
 import time
+import contextlib
+import fnmatch
+import glob
+import gzip
 import hashlib
+import heapq
+import os
+import random
 import shutil
+import sqlite3
+import struct
+import subprocess
+from bisect import bisect_left
+from functools import partial
 from pathlib import Path
+from urllib.parse import urlsplit, urljoin, quote, unquote
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+import http.client
+import io
 import json
 import re
+import ssl
 import sys
+import threading
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# 可协商的压缩编码，brotli 仅在安装了对应模块时声明
+ACCEPT_ENCODING = 'gzip, deflate, br' if brotli else 'gzip, deflate'
+
+
+_output = threading.local()
+
+
+def _print(*args, **kwargs):
+    """线程感知的输出：并发任务中写入缓冲区，由调度线程按顺序统一输出"""
+    buffer = getattr(_output, 'buffer', None)
+    if buffer is None:
+        print(*args, **kwargs)
+    else:
+        print(*args, file=buffer, **kwargs)
+
+
+class _NullOutput:
+    """丢弃写入内容的输出流，用于 --quiet 模式下的逐文件输出"""
+
+    def write(self, text):
+        return len(text)
+
+
+@contextlib.contextmanager
+def _quiet_output():
+    """在当前线程内丢弃 _print 的输出"""
+    previous = getattr(_output, 'buffer', None)
+    _output.buffer = _NullOutput()
+    try:
+        yield
+    finally:
+        _output.buffer = previous
+
+
+class Metrics:
+    """运行指标 - 计数器与分阶段耗时直方图，可导出为 JSON 行或 Prometheus 文本格式"""
+
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+    # 缓存命中率: 名称 -> (命中计数器, 未命中计数器)
+    CACHES = {
+        'stat': ('stat_cache_hits', 'stat_cache_misses'),
+        'conditional': ('not_modified', 'full_responses'),
+        'connection': ('connections_reused', 'connections_new'),
+        'object_store': ('object_store_hits', 'object_store_misses'),
+    }
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, phase, seconds):
+        with self._lock:
+            hist = self.histograms.get(phase)
+            if hist is None:
+                hist = self.histograms[phase] = {'buckets': [0] * (len(self.BUCKETS) + 1),
+                                                 'count': 0, 'sum': 0.0, 'max': 0.0}
+            hist['buckets'][bisect_left(self.BUCKETS, seconds)] += 1
+            hist['count'] += 1
+            hist['sum'] += seconds
+            hist['max'] = max(hist['max'], seconds)
+
+    @contextlib.contextmanager
+    def timer(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start)
+
+    def ratios(self):
+        result = {}
+        for cache, (hit, miss) in self.CACHES.items():
+            hits, misses = self.counters.get(hit, 0), self.counters.get(miss, 0)
+            if hits + misses:
+                result[cache] = round(hits / (hits + misses), 4)
+        return result
+
+    def snapshot(self):
+        """当前指标的副本（直方图桶为非累积计数，最后一个为 +Inf）"""
+        with self._lock:
+            return {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'counters': dict(self.counters),
+                'phases': {phase: {'count': hist['count'], 'sum': round(hist['sum'], 6),
+                                   'max': round(hist['max'], 6), 'buckets': list(hist['buckets'])}
+                           for phase, hist in self.histograms.items()},
+                'cache_hit_ratio': self.ratios(),
+                'le': list(self.BUCKETS),
+            }
+
+    def to_prometheus(self):
+        snap = self.snapshot()
+        lines = []
+        for name, value in sorted(snap['counters'].items()):
+            lines.append(f"# TYPE mirror_{name}_total counter")
+            lines.append(f"mirror_{name}_total {value}")
+        if snap['phases']:
+            lines.append('# HELP mirror_phase_seconds 各阶段耗时')
+            lines.append('# TYPE mirror_phase_seconds histogram')
+        for phase, hist in sorted(snap['phases'].items()):
+            cumulative = 0
+            for bound, count in zip(self.BUCKETS + ('+Inf',), hist['buckets']):
+                cumulative += count
+                lines.append(f'mirror_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {cumulative}')
+            lines.append(f'mirror_phase_seconds_sum{{phase="{phase}"}} {hist["sum"]}')
+            lines.append(f'mirror_phase_seconds_count{{phase="{phase}"}} {hist["count"]}')
+        if snap['cache_hit_ratio']:
+            lines.append('# TYPE mirror_cache_hit_ratio gauge')
+        for cache, ratio in sorted(snap['cache_hit_ratio'].items()):
+            lines.append(f'mirror_cache_hit_ratio{{cache="{cache}"}} {ratio}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, jsonl_file=None, prometheus_file=None):
+        """追加一行 JSON 快照，并原子重写 Prometheus 文本文件"""
+        try:
+            if jsonl_file:
+                with open(jsonl_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(self.snapshot(), ensure_ascii=False) + '\n')
+            if prometheus_file:
+                path = Path(prometheus_file)
+                temp = path.with_name(f".{path.name}.tmp")
+                temp.write_text(self.to_prometheus(), encoding='utf-8')
+                os.replace(temp, path)
+        except Exception as e:
+            print(f"⚠️  导出指标失败: {e}")
+
+    def serve(self, port, host=''):
+        """在后台线程中提供 Prometheus 抓取端点 /metrics"""
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"📈 指标端点: http://{host or '0.0.0.0'}:{server.server_port}/metrics")
+        return server
+
+
+class ContentDecoder:
+    """按 Content-Encoding 流式解压响应体"""
+
+    ENCODINGS = ('gzip', 'x-gzip', 'deflate', 'br')
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self._first = True
+        if encoding == 'br':
+            self._obj = brotli.Decompressor()
+        elif encoding == 'deflate':
+            self._obj = zlib.decompressobj()
+        else:
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    @classmethod
+    def for_headers(cls, headers):
+        """响应使用了支持的压缩编码时返回解码器，否则返回 None"""
+        encoding = (headers.get('Content-Encoding') or '').strip().lower()
+        if encoding not in cls.ENCODINGS or (encoding == 'br' and brotli is None):
+            return None
+        return cls(encoding)
+
+    def decompress(self, data):
+        if self.encoding == 'br':
+            process = getattr(self._obj, 'process', None) or self._obj.decompress
+            return process(data)
+        try:
+            return self._obj.decompress(data)
+        except zlib.error:
+            # 部分服务器的 deflate 是不带 zlib 头的原始数据流
+            if self.encoding != 'deflate' or not self._first:
+                raise
+            self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._obj.decompress(data)
+        finally:
+            self._first = False
+
+    def flush(self):
+        if self.encoding == 'br':
+            return b''
+        return self._obj.flush()
+
+
+class PooledResponse:
+    """连接池响应 - 关闭时将读完的连接归还连接池，读取时透明解压"""
+
+    def __init__(self, pool, key, conn, response, url, slot):
+        self.pool = pool
+        self.key = key
+        self.conn = conn
+        self.response = response
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        self._slot = slot
+        self._decoder = ContentDecoder.for_headers(response.headers)
+        self._transfer = self._decode = 0.0
+
+    def read(self, amt=None):
+        """读取（解压后的）响应体，连接提前关闭导致内容不完整时抛出 IncompleteRead"""
+        while True:
+            start = time.perf_counter()
+            data = self.response.read(amt)
+            self._transfer += time.perf_counter() - start
+            self.pool.metrics.inc('bytes_wire', len(data))
+            # 连接提前关闭时 read(amt) 只返回空数据，需对照剩余长度判断是否完整
+            if not data and self.response.length:
+                raise http.client.IncompleteRead(b'', self.response.length)
+            if self._decoder is None:
+                self.pool.metrics.inc('bytes_content', len(data))
+                return data
+            start = time.perf_counter()
+            if not data:
+                decoder, self._decoder = self._decoder, None
+                decoded = decoder.flush()
+            else:
+                decoded = self._decoder.decompress(data)
+                if amt is None:
+                    decoded += self._decoder.flush()
+            self._decode += time.perf_counter() - start
+            if decoded or amt is None or not data:
+                self.pool.metrics.inc('bytes_content', len(decoded))
+                return decoded
+
+    def close(self):
+        if self.conn is None:
+            return
+        conn, self.conn = self.conn, None
+        if self._transfer:
+            self.pool.metrics.observe('transfer', self._transfer)
+        if self._decode:
+            self.pool.metrics.observe('decode', self._decode)
+        try:
+            # 304/204/HEAD 等无响应体的响应不会被调用方读取，读一次空数据即可复用连接
+            if self.response.length == 0 and not self.response.isclosed():
+                self.response.read()
+            reusable = self.response.isclosed() and not self.response.will_close
+            if not reusable:
+                self.response.close()
+            self.pool.release(self.key, conn, reusable)
+        finally:
+            self.pool.release_slot(self._slot)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CachedResponse:
+    """周期缓存中已读取完毕的响应，接口与 PooledResponse 一致"""
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.reason = 'OK'
+        self.headers = headers
+        self._body = io.BytesIO(body)
+
+    def read(self, amt=None):
+        return self._body.read(-1 if amt is None else amt)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConnectionPool:
+    """HTTP/1.1 长连接池 - 按主机复用TCP/TLS连接"""
+
+    REDIRECT_CODES = (301, 302, 303, 307, 308)
+    STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                    ConnectionResetError, ConnectionAbortedError, BrokenPipeError)
+
+    def __init__(self, pool_size=4, idle_timeout=30, timeout=30, max_per_host=4, max_total=None,
+                 metrics=None):
+        self.pool_size = max(1, int(pool_size))
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.max_per_host = max(1, int(max_per_host))
+        self._total = threading.BoundedSemaphore(int(max_total)) if max_total else None
+        self.metrics = metrics or Metrics()
+        self._idle = {}
+        self._slots = {}
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+        # 与 urllib 一致：读取 http_proxy/https_proxy/no_proxy 环境变量
+        self.proxies = urllib.request.getproxies()
+
+    def proxy_for(self, scheme, host):
+        """返回目标主机应走的代理 (host, port, 认证头)，无需代理时返回 None"""
+        proxy = self.proxies.get(scheme)
+        if not proxy or urllib.request.proxy_bypass(host):
+            return None
+        if '://' not in proxy:
+            proxy = 'http://' + proxy
+        parts = urlsplit(proxy)
+        auth = None
+        if parts.username is not None:
+            credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+            auth = 'Basic ' + base64.b64encode(credentials.encode('utf-8')).decode('ascii')
+        # 未写端口时按代理 URL 的协议取默认端口，与 urlopen 一致
+        port = parts.port or (443 if parts.scheme.lower() == 'https' else 80)
+        return parts.hostname, port, auth
+
+    def host_slot(self, key):
+        """获取目标主机的并发连接信号量"""
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = threading.BoundedSemaphore(self.max_per_host)
+            return slot
+
+    def acquire_slot(self, key):
+        """占用全局与目标主机的并发名额，返回主机信号量"""
+        slot = self.host_slot(key)
+        if self._total is not None:
+            self._total.acquire()
+        slot.acquire()
+        return slot
+
+    def release_slot(self, slot):
+        slot.release()
+        if self._total is not None:
+            self._total.release()
+
+    def acquire(self, key):
+        """取出一个未过期的空闲连接，没有则新建"""
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                conn, last_used = idle.pop()
+                if now - last_used < self.idle_timeout:
+                    return conn, True
+                conn.close()
+        scheme, host, port, proxy = key
+        if proxy:
+            # https 经 CONNECT 隧道；http 直接把请求发给代理
+            proxy_host, proxy_port, auth = proxy
+            if scheme == 'https':
+                conn = http.client.HTTPSConnection(proxy_host, proxy_port, timeout=self.timeout,
+                                                   context=self._ssl_context)
+                conn.set_tunnel(host, port,
+                                headers={'Proxy-Authorization': auth} if auth else None)
+            else:
+                conn = http.client.HTTPConnection(proxy_host, proxy_port, timeout=self.timeout)
+        elif scheme == 'https':
+            conn = http.client.HTTPSConnection(host, port, timeout=self.timeout,
+                                               context=self._ssl_context)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=self.timeout)
+        return conn, False
+
+    def release(self, key, conn, reusable=True):
+        """归还连接，超出池容量或不可复用时直接关闭"""
+        if reusable:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.pool_size:
+                    idle.append((conn, time.monotonic()))
+                    return
+        conn.close()
+
+    def request(self, method, url, headers=None, max_redirects=5):
+        """发送请求并返回 PooledResponse，HTTP错误以 HTTPError 抛出"""
+        for _ in range(max_redirects + 1):
+            response = self.send(method, url, headers or {})
+            location = response.headers.get('Location')
+            if response.status in self.REDIRECT_CODES and location:
+                response.read()
+                response.close()
+                url = urljoin(url, location)
+                if response.status == 303:
+                    method = 'GET'
+                continue
+            if response.status >= 400:
+                response.read()
+                response.close()
+                raise urllib.error.HTTPError(url, response.status, response.reason,
+                                             response.headers, None)
+            return response
+        raise urllib.error.URLError(f"重定向次数过多: {url}")
+
+    def send(self, method, url, headers):
+        """在池化连接上发送单个请求，复用的连接失效时重连一次"""
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == 'https' else 80)
+        proxy = self.proxy_for(scheme, parts.hostname)
+        key = (scheme, parts.hostname, port, proxy)
+        target = quote(parts.path or '/', safe="/%:@!$&'()*+,;=-._~")
+        if parts.query:
+            target += '?' + parts.query
+        if proxy and scheme == 'http':
+            # 经 HTTP 代理时请求行必须使用绝对 URL
+            target = f"http://{parts.netloc.rpartition('@')[2]}{target}"
+            if proxy[2]:
+                headers = dict(headers, **{'Proxy-Authorization': proxy[2]})
+
+        slot = self.acquire_slot(key)
+        try:
+            while True:
+                conn, reused = self.acquire(key)
+                self.metrics.inc('connections_reused' if reused else 'connections_new')
+                try:
+                    if not reused:
+                        # 显式建立连接以便单独统计 DNS/TCP/TLS 耗时
+                        with self.metrics.timer('connect'):
+                            conn.connect()
+                    with self.metrics.timer('response'):
+                        conn.request(method, target, headers=headers)
+                        response = conn.getresponse()
+                except self.STALE_ERRORS:
+                    conn.close()
+                    if reused:
+                        continue
+                    raise
+                except Exception:
+                    conn.close()
+                    raise
+                if method == 'HEAD':
+                    response.read()
+                return PooledResponse(self, key, conn, response, url, slot)
+        except Exception:
+            self.release_slot(slot)
+            raise
+
+    def close(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn, _ in conns:
+                conn.close()
+
+
+class ScriptRule:
+    """脚本块清理规则 - 判断一个 <script>...</script> 块是否为注入脚本
+
+    设置 src 时匹配 src 属性命中且内容为空的外链脚本；否则匹配不带属性的
+    <script>，其内容以 prefix 开头、以 suffix 结尾，并在两者之间包含 marker。
+    """
+
+    def __init__(self, name, prefix=None, marker=None, suffix='', src=None):
+        self.name = name
+        self.prefix = re.compile(prefix, re.IGNORECASE) if prefix else None
+        self.marker = re.compile(marker, re.IGNORECASE) if marker else None
+        self.suffix = suffix
+        self.src = re.compile(src, re.IGNORECASE) if src else None
+
+    def matches(self, text, tag_start, body_start, body_end):
+        if self.src is not None:
+            if body_start != body_end:
+                return False
+            for m in _SRC_VALUE.finditer(text, tag_start, body_start):
+                if self.src.search(m.group(1)):
+                    return True
+            return False
+
+        if not _BARE_SCRIPT.fullmatch(text, tag_start, body_start):
+            return False
+        pos = body_start
+        if self.prefix is not None:
+            m = self.prefix.match(text, pos, body_end)
+            if not m:
+                return False
+            pos = m.end()
+        end = body_end - len(self.suffix)
+        if end < pos or not text.startswith(self.suffix, end, body_end):
+            return False
+        return self.marker is None or self.marker.search(text, pos, end) is not None
+
+
+_BARE_SCRIPT = re.compile(r'<script>', re.IGNORECASE)
+_SCRIPT_OPEN = re.compile(r'<script', re.IGNORECASE)
+_SCRIPT_CLOSE = re.compile(r'</script>', re.IGNORECASE)
+_SRC_VALUE = re.compile(r'(?=src=["\']([^"\']*)["\'])', re.IGNORECASE)
+_BODY_CLOSE = re.compile(r'</body>', re.IGNORECASE)
+_HTML_CLOSE = re.compile(r'</html>', re.IGNORECASE)
+_BLANK_LINES = re.compile(r'\n\s*\n\s*\n+')
+_HTML_REF = re.compile(r'(?:href|src)\s*=\s*["\']([^"\'<>]+)["\']|url\(\s*["\']?([^"\')]+)', re.IGNORECASE)
+_CSS_REF = re.compile(r'url\(\s*["\']?([^"\')]+)|@import\s+["\']([^"\']+)', re.IGNORECASE)
+_MANIFEST_PROJECT = re.compile(r'["\']?path["\']?\s*:\s*["\']([^"\']+)["\'][^{}]*?'
+                               r'["\']?files["\']?\s*:\s*\[([^\]]*)\]')
+_QUOTED = re.compile(r'["\']([^"\']+)["\']')
+
+DEFAULT_SCRIPT_RULES = (
+    ScriptRule('livereload-document-write', prefix=r'document\.write\(',
+               marker=r'livereload\.js', suffix=')'),
+    ScriptRule('livereload-disconnect-listener', prefix=r'\s*document\.addEventListener\(',
+               marker=r'LiveReloadDisconnect', suffix=')'),
+    ScriptRule('reload-plugin-class', prefix=r'\s*class\s+reloadPlugin'),
+    ScriptRule('livereload-src', src=r'livereload\.js'),
+    ScriptRule('port-35929-src', src=r':35929'),
+)
+
+
+class HtmlSanitizer:
+    """HTML净化器 - 线性扫描 <script> 块，按规则移除 LiveReload 等注入脚本"""
+
+    def __init__(self, rules=DEFAULT_SCRIPT_RULES, trailing_marker=r'livereload'):
+        self.rules = tuple(rules)
+        self.trailing_marker = re.compile(trailing_marker, re.IGNORECASE)
+
+    def clean(self, content):
+        text = content.decode('utf-8', errors='ignore')
+        html_end = text.find('</html>')
+        if html_end != -1:
+            text = text[:html_end + len('</html>')]
+
+        pieces = []
+        start = 0
+        for removed_start, removed_end in self.trailing_spans(text):
+            self.scan_blocks(text, start, removed_start, pieces)
+            start = removed_end
+        self.scan_blocks(text, start, len(text), pieces)
+        text = ''.join(pieces)
+
+        html_end = text.find('</html>')
+        if html_end != -1:
+            text = text[:html_end + len('</html>')]
+        text = _BLANK_LINES.sub('\n\n', text)
+        text = text.strip()
+        if not text.endswith('</html>'):
+            text += '\n</html>'
+        return text.encode('utf-8')
+
+    def trailing_spans(self, text):
+        """定位 </body> 之后由注入脚本组成、直到 </html> 的区域
+
+        区域以不带属性的 <script> 开始、以 </script> 加空白结束，并且在最后一个
+        </script> 之前包含 trailing_marker。返回要删除的 [start, end) 区间列表。
+        """
+        spans = []
+        pos = 0
+        marker = None
+        closes = html_starts = None
+        for m in _BODY_CLOSE.finditer(text):
+            if m.start() < pos:
+                continue
+            start = m.end()
+            while start < len(text) and text[start].isspace():
+                start += 1
+            if not _BARE_SCRIPT.match(text, start):
+                continue
+            if marker is None or marker.start() < start + len('<script>'):
+                marker = self.trailing_marker.search(text, start + len('<script>'))
+                if marker is None:
+                    break
+            if closes is None:
+                closes, html_starts = self.script_closes(text)
+            k = bisect_left(closes, marker.end())
+            if k == len(closes):
+                continue
+            spans.append((start, html_starts[k]))
+            pos = html_starts[k] + len('</html>')
+        return spans
+
+    def script_closes(self, text):
+        """找出紧跟在 </script> 与空白之后的 </html>，返回两者起始位置的列表"""
+        closes = []
+        html_starts = []
+        for m in _HTML_CLOSE.finditer(text):
+            end = m.start()
+            while end > 0 and text[end - 1].isspace():
+                end -= 1
+            if end >= len('</script>') and _SCRIPT_CLOSE.fullmatch(text, end - len('</script>'), end):
+                closes.append(end - len('</script>'))
+                html_starts.append(m.start())
+        return closes, html_starts
+
+    def scan_blocks(self, text, start, end, pieces):
+        """扫描 [start, end) 内的 <script> 块，保留未命中规则的内容"""
+        pos = start
+        while True:
+            tag = _SCRIPT_OPEN.search(text, pos, end)
+            if not tag:
+                break
+            # 只匹配字面前缀再找 '>'，避免 [^>]* 在无 '>' 的 <script 上反复扫到末尾
+            tag_end = text.find('>', tag.end(), end)
+            if tag_end == -1:
+                break
+            tag_end += 1
+            close = _SCRIPT_CLOSE.search(text, tag_end, end)
+            if not close:
+                break
+            if any(rule.matches(text, tag.start(), tag_end, close.start()) for rule in self.rules):
+                pieces.append(text[start:tag.start()])
+                start = close.end()
+            pos = close.end()
+        pieces.append(text[start:end])
+
+
+_worker_sanitizer = None
+
+
+def _init_clean_worker(sanitizer):
+    """进程池初始化：每个子进程只接收一次净化器，避免每个任务重复传输"""
+    global _worker_sanitizer
+    _worker_sanitizer = sanitizer
+
+
+def _clean_and_hash(content):
+    """进程池任务：净化 HTML 并计算哈希，返回 (净化结果, 哈希, 错误信息, 子进程CPU秒数)"""
+    start = time.process_time()
+    error = None
+    try:
+        cleaned = _worker_sanitizer.clean(content)
+    except Exception as e:
+        cleaned, error = content, str(e)
+    digest = hashlib.md5(cleaned).hexdigest()
+    return cleaned, digest, error, time.process_time() - start
+
+
+def create_clean_pool(processes, sanitizer=None):
+    """创建用于净化与哈希的进程池"""
+    return ProcessPoolExecutor(max_workers=int(processes), initializer=_init_clean_worker,
+                               initargs=(sanitizer or HtmlSanitizer(),))
+
+
+class PollScheduler:
+    """自适应轮询间隔：有变化时加速，空闲时逐步放缓，失败时指数退避并加随机抖动"""
+
+    def __init__(self, interval=60, min_interval=None, max_interval=None, decay=1.5,
+                 max_backoff=None, jitter=0.2):
+        self.min_interval = max(1, min_interval if min_interval is not None else interval)
+        self.max_interval = max(self.min_interval,
+                                max_interval if max_interval is not None else interval)
+        self.decay = max(1.0, float(decay))
+        self.max_backoff = max_backoff or self.max_interval * 10
+        self.jitter = jitter
+        self.interval = min(max(interval, self.min_interval), self.max_interval)
+        self.failures = 0
+
+    @property
+    def adaptive(self):
+        return self.min_interval < self.max_interval
+
+    def next_delay(self, result):
+        """根据本次检查结果计算下次等待秒数：True=有变化，False=无变化，None=失败"""
+        if result is None:
+            self.failures += 1
+            delay = min(self.interval * 2 ** self.failures, self.max_backoff)
+            return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+        self.failures = 0
+        if result:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.decay, self.max_interval)
+        return self.interval
+
+
+class StateStore:
+    """同步状态存储 - SQLite WAL 模式，按路径保存哈希、本地 stat、校验值与时间戳，逐文件提交"""
+
+    FILENAME = '.sync_state.db'
+    LEGACY_FILES = ('.file_hashes.json', '.file_meta.json')
+    FILES = (FILENAME, FILENAME + '-wal', FILENAME + '-shm') + LEGACY_FILES
+    FIELDS = ('hash', 'size', 'mtime_ns', 'inode', 'local_hash', 'etag', 'last_modified', 'partial',
+              'variants', 'optimized')
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.path = self.directory / self.FILENAME
+        self._conn = None
+        self._lock = threading.Lock()
+        # 已有状态时立即打开，使旧版 JSON 的迁移发生在同步开始之前
+        if any((self.directory / name).exists() for name in (self.FILENAME,) + self.LEGACY_FILES):
+            self.connection()
+
+    def connection(self):
+        """首次使用时打开数据库（调用方持有锁），并自动迁移旧版 JSON 状态文件"""
+        if self._conn is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, hash TEXT, '
+                         'size INTEGER, mtime_ns INTEGER, inode INTEGER, local_hash TEXT, '
+                         'etag TEXT, last_modified TEXT, partial TEXT, variants TEXT, '
+                         'optimized TEXT, updated_at REAL)')
+            # 旧版本创建的数据库缺少后来增加的列
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(files)')}
+            for name in self.FIELDS:
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE files ADD COLUMN {name} TEXT")
+            self._conn = conn
+            self.migrate()
+        return self._conn
+
+    def migrate(self):
+        """导入 .file_hashes.json / .file_meta.json，导入成功后删除旧文件"""
+        legacy = [self.directory / name for name in self.LEGACY_FILES]
+        if not any(path.exists() for path in legacy):
+            return
+        try:
+            hashes, meta = (json.loads(path.read_text(encoding='utf-8')) if path.exists() else {}
+                            for path in legacy)
+        except Exception as e:
+            print(f"⚠️  旧状态文件无法读取，跳过迁移: {e}")
+            return
+        rows = []
+        for key in set(hashes) | set(meta):
+            fields = meta.get(key, {})
+            rows.append((key, hashes.get(key)) + tuple(fields.get(name) for name in self.FIELDS[1:])
+                        + (time.time(),))
+        placeholders = ', '.join('?' * (len(self.FIELDS) + 2))
+        # 已存在的记录比旧文件更新，迁移中断后重试时不覆盖
+        with self._conn:
+            self._conn.execute('BEGIN')
+            self._conn.executemany(f"INSERT OR IGNORE INTO files (path, {', '.join(self.FIELDS)}, "
+                                   f"updated_at) VALUES ({placeholders})", rows)
+        for path in legacy:
+            path.unlink(missing_ok=True)
+        print(f"📦 已迁移 {len(rows)} 条同步状态到 {self.FILENAME}")
+
+    def get(self, key):
+        """返回路径的状态字段（省略空值），不存在时返回空字典"""
+        if key is None:
+            return {}
+        with self._lock:
+            row = self.connection().execute(
+                f"SELECT {', '.join(self.FIELDS)} FROM files WHERE path = ?", (key,)).fetchone()
+        if row is None:
+            return {}
+        return {name: value for name, value in zip(self.FIELDS, row) if value is not None}
+
+    def update(self, key, **fields):
+        """更新路径的部分字段并立即提交，值为 None 表示清除"""
+        if key is None:
+            return
+        names = list(fields) + ['updated_at']
+        values = [fields[name] for name in fields] + [time.time()]
+        assignments = ', '.join(f"{name} = excluded.{name}" for name in names)
+        with self._lock:
+            self.connection().execute(
+                f"INSERT INTO files (path, {', '.join(names)}) VALUES (?{', ?' * len(names)}) "
+                f"ON CONFLICT(path) DO UPDATE SET {assignments}", [key] + values)
+
+    def paths(self):
+        """所有已记录远程哈希的路径"""
+        with self._lock:
+            rows = self.connection().execute(
+                'SELECT path FROM files WHERE hash IS NOT NULL ORDER BY path').fetchall()
+        return [row[0] for row in rows]
+
+    def has_hashes(self):
+        with self._lock:
+            return self.connection().execute(
+                'SELECT 1 FROM files WHERE hash IS NOT NULL LIMIT 1').fetchone() is not None
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class ObjectStore:
+    """内容寻址对象库 - 以内容哈希为键保存文件，镜像与备份通过硬链接共享同一份数据
+
+    对象位于 <root>/<hash[:2]>/<hash>，必须与镜像目录在同一文件系统上。镜像文件总是
+    整体替换而不会原地修改，因此硬链接到同一对象是安全的；只剩对象库自身引用
+    (st_nlink == 1) 的对象由 gc() 回收。链接已有对象前会校验其内容与哈希一致，
+    被意外原地改写的对象会从对象库移除，不再扩散到新的镜像或备份。
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._verified = set()
+        self._lock = threading.Lock()
+
+    def object_path(self, digest):
+        return self.root / digest[:2] / digest
+
+    def link_temp(self, target):
+        return target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.part")
+
+    def verified(self, digest):
+        """对象存在且内容哈希与名称一致；不一致时移除该对象并返回 False
+
+        按 inode/大小/修改时间缓存校验结果，未被改动的对象只读取一次。
+        """
+        obj = self.object_path(digest)
+        try:
+            st = obj.stat()
+        except FileNotFoundError:
+            return False
+        key = (digest, st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            if key in self._verified:
+                return True
+        actual = hashlib.md5()
+        with open(obj, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                actual.update(chunk)
+        if actual.hexdigest() == digest:
+            with self._lock:
+                self._verified.add(key)
+            return True
+        _print(f"    ⚠️  对象库中的 {digest[:12]} 内容与哈希不符，已移除")
+        obj.unlink(missing_ok=True)
+        return False
+
+    def install(self, digest, target, temp_file=None, content=None):
+        """把内容放到 target：对象已存在时直接硬链接，否则用新内容创建对象
+
+        新内容来自已写好的 temp_file 或内存中的 content，返回是否复用了已有对象。
+        """
+        target.parent.mkdir(parents=True, exist_ok=True)
+        link_temp = self.link_temp(target)
+        link_temp.unlink(missing_ok=True)
+        if self.verified(digest):
+            try:
+                os.link(self.object_path(digest), link_temp)
+                os.replace(link_temp, target)
+                if temp_file is not None:
+                    temp_file.unlink(missing_ok=True)
+                return True
+            except FileNotFoundError:
+                pass
+
+        owned = temp_file is None
+        if owned:
+            temp_file = link_temp
+            with open(temp_file, 'wb') as f:
+                f.write(content)
+        try:
+            self.object_path(digest).parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(temp_file, self.object_path(digest))
+            except FileExistsError:
+                pass
+            os.replace(temp_file, target)
+        except:
+            if owned:
+                temp_file.unlink(missing_ok=True)
+            raise
+        return False
+
+    def adopt(self, digest, path):
+        """把已有的镜像文件纳入对象库；对象已存在时改为硬链接到对象，返回是否去重"""
+        obj = self.object_path(digest)
+        try:
+            if obj.exists():
+                if os.path.samefile(obj, path):
+                    return False
+                if self.verified(digest):
+                    link_temp = self.link_temp(path)
+                    link_temp.unlink(missing_ok=True)
+                    os.link(obj, link_temp)
+                    os.replace(link_temp, path)
+                    return True
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            os.link(path, obj)
+            return False
+        except OSError:
+            return False
+
+    def contains(self, digest, path):
+        """path 是否就是对象库中该哈希对应的对象（同一 inode）"""
+        try:
+            return os.path.samefile(self.object_path(digest), path)
+        except OSError:
+            return False
+
+    def gc(self):
+        """删除不再被镜像或备份引用的对象，返回 (对象数, 字节数)"""
+        removed = freed = 0
+        if not self.root.exists():
+            return removed, freed
+        for bucket in self.root.iterdir():
+            if not bucket.is_dir():
+                continue
+            for obj in bucket.iterdir():
+                try:
+                    st = obj.stat()
+                    if st.st_nlink <= 1:
+                        obj.unlink()
+                        removed += 1
+                        freed += st.st_size
+                except OSError:
+                    pass
+            try:
+                bucket.rmdir()
+            except OSError:
+                pass
+        return removed, freed
+
+
+class AssetOptimizer:
+    """下载后处理 - 为文本资源生成 .gz/.br 预压缩副本，对图片做无损重压缩
+
+    副本与原文件并排存放（app.js -> app.js.gz / app.js.br），只在比原文件小时保留。
+    PNG 重新压缩 IDAT 数据流，JPEG 在系统提供 jpegtran 时优化编码，像素数据不变。
+    """
+
+    PRECOMPRESS_EXTENSIONS = ('.html', '.htm', '.css', '.js')
+    # 按优先级排列：客户端同时支持时优先返回 brotli
+    VARIANTS = (('br', '.br'), ('gzip', '.gz'))
+    PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+    def __init__(self):
+        self.encodings = [name for name, _ in self.VARIANTS if name != 'br' or brotli]
+        self.jpegtran = shutil.which('jpegtran')
+
+    @classmethod
+    def precompressible(cls, name):
+        return name.lower().endswith(cls.PRECOMPRESS_EXTENSIONS)
+
+    def is_variant(self, name):
+        """是否为预压缩副本而非镜像文件本身"""
+        return any(name.endswith(suffix) and self.precompressible(name[:-len(suffix)])
+                   for _, suffix in self.VARIANTS)
+
+    def variants(self, content):
+        """返回 {后缀: 压缩数据}，不能减小体积的编码对应 None（应删除旧副本）"""
+        result = {}
+        for name, suffix in self.VARIANTS:
+            data = None
+            if name in self.encodings:
+                if name == 'br':
+                    data = brotli.compress(content)
+                else:
+                    data = gzip.compress(content, compresslevel=9, mtime=0)
+            result[suffix] = data if data is not None and len(data) < len(content) else None
+        return result
+
+    def recompress(self, name, content):
+        """无损重压缩图片，返回更小的内容；无法优化时返回 None"""
+        lower = name.lower()
+        if lower.endswith('.png'):
+            optimized = self.recompress_png(content)
+        elif lower.endswith(('.jpg', '.jpeg')) and self.jpegtran:
+            optimized = self.recompress_jpeg(content)
+        else:
+            return None
+        return optimized if optimized is not None and len(optimized) < len(content) else None
+
+    def recompress_png(self, content):
+        """合并 IDAT 块并以最高压缩级别重新 deflate，其余块原样保留"""
+        if not content.startswith(self.PNG_SIGNATURE):
+            return None
+        pos, chunks, idat = len(self.PNG_SIGNATURE), [], []
+        while pos + 12 <= len(content):
+            length, kind = struct.unpack('>I4s', content[pos:pos + 8])
+            end = pos + 12 + length
+            if end > len(content):
+                return None
+            if kind == b'IDAT':
+                if not idat:
+                    chunks.append(None)
+                idat.append(content[pos + 8:end - 4])
+            else:
+                chunks.append(content[pos:end])
+            pos = end
+            if kind == b'IEND':
+                break
+        if not idat:
+            return None
+        try:
+            raw = zlib.decompress(b''.join(idat))
+        except zlib.error:
+            return None
+
+        best = None
+        for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+            compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+            data = compressor.compress(raw) + compressor.flush()
+            if best is None or len(data) < len(best):
+                best = data
+        chunk = struct.pack('>I', len(best)) + b'IDAT' + best + struct.pack('>I', zlib.crc32(b'IDAT' + best))
+        return self.PNG_SIGNATURE + b''.join(chunk if c is None else c for c in chunks) + content[pos:]
+
+    def recompress_jpeg(self, content):
+        """调用 jpegtran 无损优化哈夫曼编码（保留全部元数据）"""
+        try:
+            result = subprocess.run([self.jpegtran, '-copy', 'all', '-optimize', '-progressive'],
+                                    input=content, capture_output=True, timeout=60)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        if result.returncode != 0 or not result.stdout.startswith(b'\xff\xd8'):
+            return None
+        return result.stdout
 
 
 class ProjectMirrorSync:
     """项目镜像同步器 - 清理HTML注入脚本"""
 
-    def __init__(self, base_url, local_path, check_interval=60):
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'Cache-Control': 'no-cache',
+        'Pragma': 'no-cache',
+        'Accept-Encoding': ACCEPT_ENCODING,
+    }
+    STATE_FILES = StateStore.FILES
+    PARTIAL_PATTERN = '.*.part'
+    CHUNK_SIZE = 64 * 1024
+    RACY_WINDOW_NS = 2 * 10 ** 9
+    # 软404检测只扫描文本类响应的开头部分
+    SOFT_404_PREFIX = 32 * 1024
+    # 未配置哨兵和清单时，每次轮询探测的已跟踪文件数
+    PROBE_BATCH = 16
+    SOFT_404_TYPES = ('text/', 'application/xhtml+xml', 'application/xml', 'application/json',
+                      'application/javascript')
+    # 小于该大小的 HTML 在线程内直接处理，进程间传输的开销超过净化本身
+    PROCESS_MIN_BYTES = 32 * 1024
+
+    def __init__(self, base_url, local_path, check_interval=60, workers=1, max_per_host=4,
+                 pool_size=4, idle_timeout=30, pool=None, sanitizer=None,
+                 backup_mode='full', backup_keep=0, discover=False, manifest=None,
+                 probe=False, sentinels=None, min_interval=None, max_interval=None, decay=1.5,
+                 resume_attempts=2, object_store=None, metrics=None, quiet=False,
+                 metrics_file=None, prometheus_file=None, metrics_port=None,
+                 clean_processes=0, clean_pool=None, optimize=False):
         self.base_url = base_url.rstrip('/')
         self.local_path = Path(local_path)
         self.check_interval = check_interval
-        self.hash_file = self.local_path / '.file_hashes.json'
-        self.file_hashes = self.load_hashes()
+        self.scheduler = PollScheduler(check_interval, min_interval, max_interval, decay)
+        self.workers = max(1, int(workers))
+        self.metrics = metrics or (pool.metrics if pool else Metrics())
+        self.pool = pool or ConnectionPool(pool_size=pool_size, idle_timeout=idle_timeout,
+                                           max_per_host=max_per_host, metrics=self.metrics)
+        self.quiet = quiet
+        self.metrics_file = metrics_file
+        self.prometheus_file = prometheus_file
+        self.metrics_port = metrics_port
+        self.sanitizer = sanitizer or HtmlSanitizer()
+        self.clean_processes = int(clean_processes or 0)
+        self.clean_pool = clean_pool
+        self._owns_clean_pool = clean_pool is None
+        self.discover = discover
+        self.manifest = manifest
+        self.probe = probe
+        self.sentinels = sentinels
+        self.backup_mode = backup_mode
+        self.backup_keep = max(0, int(backup_keep))
+        self.resume_attempts = max(0, int(resume_attempts))
+        self.state = StateStore(self.local_path)
+        if object_store is True:
+            object_store = self.local_path.parent / '.mirror_objects'
+        self.objects = ObjectStore(object_store) if object_store else None
+        self.optimizer = AssetOptimizer() if optimize else None
         self.stats = {'downloaded': 0, 'skipped': 0, 'failed': 0}
-
-    def load_hashes(self):
-        if self.hash_file.exists():
-            try:
-                with open(self.hash_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-
-    def save_hashes(self):
-        try:
-            self.local_path.mkdir(parents=True, exist_ok=True)
-            with open(self.hash_file, 'w', encoding='utf-8') as f:
-                json.dump(self.file_hashes, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"  保存哈希失败: {e}")
+        self.interrupted = []
+        self._cycle = None
+        self._probe_cursor = 0
+        self._lock = threading.Lock()
+
+    def conditional_headers(self, key):
+        """根据已保存的 ETag / Last-Modified 生成条件请求头"""
+        meta = self.state.get(key)
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def record_validators(self, key, headers, merge=False, **fields):
+        """保存响应中的 ETag / Last-Modified 校验值，fields 中的其它字段在同一次提交中写入
+
+        304 响应可能省略部分校验值，此时使用 merge=True 保留已有记录。
+        """
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not merge or etag:
+            fields['etag'] = etag
+        if not merge or last_modified:
+            fields['last_modified'] = last_modified
+        if fields:
+            self.state.update(key, **fields)
 
     def get_file_hash(self, content):
         if isinstance(content, str):
             content = content.encode('utf-8')
-        return hashlib.md5(content).hexdigest()
+        with self.metrics.timer('hash'):
+            return hashlib.md5(content).hexdigest()
 
     def get_local_file_hash(self, file_path):
         try:
             if not file_path.exists():
                 return None
-            with open(file_path, 'rb') as f:
-                return self.get_file_hash(f.read())
+            st = file_path.stat()
+            key = self.meta_key(file_path)
+            meta = self.state.get(key)
+            if (meta.get('local_hash') and meta.get('size') == st.st_size
+                    and meta.get('mtime_ns') == st.st_mtime_ns and meta.get('inode') == st.st_ino):
+                self.metrics.inc('stat_cache_hits')
+                return meta['local_hash']
+
+            self.metrics.inc('stat_cache_misses')
+            digest = hashlib.md5()
+            with self.metrics.timer('local_hash'), open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            self.record_stat(key, st, digest.hexdigest())
+            return digest.hexdigest()
         except:
             return None
 
+    def meta_key(self, file_path):
+        """本地文件在状态记录中的键（相对路径）"""
+        try:
+            return file_path.relative_to(self.local_path).as_posix()
+        except ValueError:
+            return None
+
+    def record_stat(self, key, st, local_hash):
+        """缓存本地文件的 size / mtime_ns / inode 与哈希，stat 不变时无需重新读取"""
+        # 刚修改过的文件可能在同一时间戳内再次被改写，暂不缓存
+        if key is None or time.time_ns() - st.st_mtime_ns < self.RACY_WINDOW_NS:
+            return
+        self.state.update(key, size=st.st_size, mtime_ns=st.st_mtime_ns,
+                          inode=st.st_ino, local_hash=local_hash)
+
+    def is_internal_file(self, name):
+        """判断是否为同步器自身的状态文件或未完成的临时文件"""
+        return name in self.STATE_FILES or fnmatch.fnmatch(name, self.PARTIAL_PATTERN)
+
+    def temp_path(self, local_file):
+        """目标目录下的临时文件路径，保证重命名在同一文件系统内原子完成"""
+        return local_file.with_name(f".{local_file.name}.{os.getpid()}.{threading.get_ident()}.part")
+
+    def write_file(self, local_file, content):
+        """先写临时文件再原子替换，避免留下写了一半的文件"""
+        local_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = self.temp_path(local_file)
+        try:
+            with open(temp_file, 'wb') as f:
+                f.write(content)
+            os.replace(temp_file, local_file)
+        except:
+            temp_file.unlink(missing_ok=True)
+            raise
+
+    def install_file(self, local_file, digest, content=None, temp_file=None):
+        """写入镜像文件；启用对象库时经由对象库硬链接，内容已存在则无需再写一份"""
+        if self.objects is not None:
+            try:
+                with self.metrics.timer('write'):
+                    reused = self.objects.install(digest, local_file, temp_file, content)
+                self.metrics.inc('object_store_hits' if reused else 'object_store_misses')
+                return reused
+            except OSError as e:
+                # 对象库不可用（如跨文件系统无法硬链接）时退回普通写入
+                _print(f"    对象库写入失败: {str(e)[:50]}")
+        with self.metrics.timer('write'):
+            if temp_file is None:
+                self.write_file(local_file, content)
+            else:
+                os.replace(temp_file, local_file)
+        return False
+
+    def optimize_file(self, key, local_file, digest, content=None, force=False):
+        """下载后处理：生成预压缩副本或无损重压缩图片
+
+        处理结果按源文件哈希记录在状态库中，源文件未变化时不重复处理；force 表示
+        本地文件刚被重新写入（此前的重压缩结果已被覆盖）。
+        """
+        if self.optimizer is None or digest is None:
+            return
+        record = self.state.get(key)
+        if not force and record.get('variants', '').split(':')[0] == digest:
+            return
+        try:
+            with self.metrics.timer('optimize'):
+                if content is None:
+                    content = local_file.read_bytes()
+                fields = {'optimized': None}
+                encodings = []
+                if self.optimizer.precompressible(local_file.name):
+                    for suffix, data in self.optimizer.variants(content).items():
+                        variant = local_file.with_name(local_file.name + suffix)
+                        if data is None:
+                            variant.unlink(missing_ok=True)
+                        else:
+                            self.write_file(variant, data)
+                            encodings.append(suffix[1:])
+                else:
+                    optimized = self.optimizer.recompress(local_file.name, content)
+                    if optimized is not None:
+                        fields['optimized'] = self.get_file_hash(optimized)
+                        self.install_file(local_file, fields['optimized'], optimized)
+                        self.metrics.inc('optimized_bytes_saved', len(content) - len(optimized))
+                self.state.update(key, variants=f"{digest}:{','.join(encodings)}", **fields)
+            self.metrics.inc('optimized_files')
+        except Exception as e:
+            _print(f"    优化失败: {str(e)[:50]}")
+
+    def resume_path(self, local_file):
+        """可续传的部分下载文件路径，固定命名以便下一次请求从断点继续"""
+        return local_file.with_name(f".{local_file.name}.part")
+
+    def stream_to_part(self, response, part_file, offset=0):
+        """分块写入部分下载文件并增量计算哈希，offset>0 时追加在已有内容之后
+
+        返回 (哈希, 总字节数, 是否为404页面)；中途失败时保留已写入的内容供续传。
+        """
+        part_file.parent.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.md5()
+        head = bytearray()
+        if offset:
+            with open(part_file, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    if len(head) < self.SOFT_404_PREFIX:
+                        head += chunk
+        size = offset
+        hash_time = write_time = 0.0
+        try:
+            with open(part_file, 'ab' if offset else 'wb') as f:
+                for chunk in iter(lambda: response.read(self.CHUNK_SIZE), b''):
+                    start = time.perf_counter()
+                    digest.update(chunk)
+                    hashed = time.perf_counter()
+                    f.write(chunk)
+                    hash_time += hashed - start
+                    write_time += time.perf_counter() - hashed
+                    size += len(chunk)
+                    if len(head) < self.SOFT_404_PREFIX:
+                        head += chunk
+        finally:
+            self.metrics.observe('hash', hash_time)
+            self.metrics.observe('write', write_time)
+        return digest.hexdigest(), size, self.is_soft_404(response.headers, bytes(head))
+
+    def resume_offset(self, key, part_file):
+        """已保留的部分下载字节数；没有可用于 If-Range 的校验值时丢弃部分文件"""
+        if part_file is None or not part_file.exists():
+            return 0
+        if self.state.get(key).get('partial'):
+            return part_file.stat().st_size
+        part_file.unlink(missing_ok=True)
+        return 0
+
+    def record_partial(self, key, headers):
+        """记录正在下载的版本的校验值，If-Range 只接受强 ETag 或 Last-Modified"""
+        etag = headers.get('ETag')
+        validator = etag if etag and not etag.startswith('W/') else headers.get('Last-Modified')
+        self.state.update(key, partial=validator)
+
+    def discard_partial(self, key, part_file):
+        part_file.unlink(missing_ok=True)
+        self.state.update(key, partial=None)
+
+    def keep_partial(self, key, part_file):
+        """传输中断后决定是否保留部分文件，返回保留的字节数"""
+        try:
+            size = part_file.stat().st_size
+        except OSError:
+            size = 0
+        if size and self.state.get(key).get('partial'):
+            return size
+        self.discard_partial(key, part_file)
+        return 0
+
+    def range_matches(self, response, offset):
+        """206 响应的 Content-Range 起点必须与本地已有字节数一致"""
+        match = re.match(r'bytes\s+(\d+)-', response.headers.get('Content-Range', ''))
+        return response.status == 206 and match is not None and int(match.group(1)) == offset
+
+    def is_soft_404(self, headers, prefix):
+        """服务器以 200 返回的 “Page Not Found” 页面
+
+        HTTP 错误状态已由连接池抛出；这里只对文本类型（或未声明类型）的响应，
+        在不超过 SOFT_404_PREFIX 字节的开头中按字节查找，不解码整个响应体。
+        """
+        content_type = (headers.get('Content-Type') or '').lower()
+        if content_type and not content_type.startswith(self.SOFT_404_TYPES):
+            return False
+        prefix = prefix[:self.SOFT_404_PREFIX]
+        return b'404' in prefix and b'Page Not Found' in prefix
+
+    def count(self, key):
+        """线程安全地累加统计计数"""
+        with self._lock:
+            self.stats[key] += 1
+        self.metrics.inc(f"files_{key}")
+
     def download_file(self, url):
+        result = self.fetch(url)
+        return result[2] if result else None
+
+    @contextlib.contextmanager
+    def request_cycle(self):
+        """一个检查周期内共享已下载的响应与净化结果，周期结束即丢弃（可嵌套）"""
+        if self._cycle is not None:
+            yield
+            return
+        self._cycle = {'responses': {}, 'cleaned': {}}
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Cache-Control': 'no-cache',
-                'Pragma': 'no-cache',
-            }
-            req = urllib.request.Request(url, headers=headers)
-            with urllib.request.urlopen(req, timeout=30) as response:
-                return response.read()
+            yield
+        finally:
+            self._cycle = None
+
+    def cached_response(self, url, extra_headers=None):
+        """查找本周期内已下载的 200 响应；完整响应同样可以回答条件请求"""
+        cycle = self._cycle
+        if cycle is None or (extra_headers and 'Range' in extra_headers):
+            return None
+        url = self.cache_url(url)
+        entry = (cycle['responses'].get((url, tuple(sorted((extra_headers or {}).items()))))
+                 or cycle['responses'].get((url, ())))
+        if entry is None:
+            return None
+        self.metrics.inc('cycle_cache_hits')
+        return CachedResponse(*entry)
+
+    def fetch(self, url, extra_headers=None):
+        """下载URL，返回 (状态码, 响应头, 内容)，失败返回 None"""
+        response = self.open_url(url, extra_headers)
+        if response is None:
+            return None
+        try:
+            with response:
+                result = response.status, response.headers, response.read()
+        except Exception as e:
+            _print(f"    下载失败: {str(e)[:50]}")
+            return None
+        cycle = self._cycle
+        if cycle is not None and result[0] == 200:
+            with self._lock:
+                cycle['responses'][(self.cache_url(url), tuple(sorted((extra_headers or {}).items())))] = result
+        return result
+
+    def cache_url(self, url):
+        """base_url 与 base_url/index.html 都同步到本地 index.html，按同一资源缓存"""
+        return self.base_url if url == f"{self.base_url}/index.html" else url
+
+    def open_url(self, url, extra_headers=None):
+        """发起请求并返回未读取的响应，供调用方流式读取，失败返回 None"""
+        cached = self.cached_response(url, extra_headers)
+        if cached is not None:
+            return cached
+        headers = dict(self.HEADERS, **(extra_headers or {}))
+        try:
+            return self.pool.request('GET', url, headers)
         except urllib.error.HTTPError as e:
-            print(f"    HTTP错误 {e.code}")
+            _print(f"    HTTP错误 {e.code}")
             return None
         except Exception as e:
-            print(f"    下载失败: {str(e)[:50]}")
+            _print(f"    下载失败: {str(e)[:50]}")
             return None
 
+    def cleaned_cache(self, content):
+        """本周期内已缓存响应（首页、清单）的净化结果缓存
+
+        只有这几个会被多次净化的响应才缓存，其余页面净化后即释放，内存不随页面数增长。
+        """
+        cycle = self._cycle
+        if cycle is None:
+            return None
+        with self._lock:
+            bodies = [entry[2] for entry in cycle['responses'].values()]
+        if any(body is content or body == content for body in bodies):
+            return cycle['cleaned']
+        return None
+
     def clean_html(self, content):
-        """清理HTML中注入的脚本"""
-        try:
-            text = content.decode('utf-8', errors='ignore')
-            html_end = text.find('</html>')
-            if html_end != -1:
-                html_end_tag = html_end + len('</html>')
-                text = text[:html_end_tag]
-
-            text = re.sub(
-                r'(</body>\s*)<script>.*?livereload.*?</script>\s*(<script>.*?</script>\s*)*\s*(</html>)',
-                r'\1\3',
-                text,
-                flags=re.DOTALL | re.IGNORECASE
-            )
-
-            patterns = [
-                r'<script>document\.write\(.*?livereload\.js.*?\)</script>',
-                r'<script>\s*document\.addEventListener\(.*?LiveReloadDisconnect.*?\)</script>',
-                r'<script>\s*class\s+reloadPlugin.*?</script>',
-                r'<script[^>]*src=["\'][^"\']*livereload\.js[^"\']*["\'][^>]*></script>',
-                r'<script[^>]*src=["\'][^"\']*:35929[^"\']*["\'][^>]*></script>',
-            ]
-
-            for pattern in patterns:
-                text = re.sub(pattern, '', text, flags=re.DOTALL | re.IGNORECASE)
-
-            text = re.sub(r'(</html>).*$', r'\1', text, flags=re.DOTALL)
-            text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)
-            text = text.strip()
-            if not text.endswith('</html>'):
-                text += '\n</html>'
-
-            return text.encode('utf-8')
+        """清理HTML中注入的脚本，同一周期内首页等共享响应只净化一次"""
+        cleaned = self.cleaned_cache(content)
+        if cleaned is not None and content in cleaned:
+            self.metrics.inc('cycle_cache_hits')
+            return cleaned[content]
+        try:
+            with self.metrics.timer('clean_html'):
+                result = self.sanitizer.clean(content)
+            if cleaned is not None:
+                with self._lock:
+                    cleaned[content] = result
+            return result
         except Exception as e:
-            print(f"    清理HTML失败: {e}")
+            _print(f"    清理HTML失败: {e}")
             return content
 
+    def clean_and_hash(self, content):
+        """净化 HTML 并计算哈希；启用进程池且内容较大时交给子进程，绕开 GIL
+
+        内容通过 pickle 传给子进程（各复制一次），因此只对足够大的页面值得。
+        """
+        cleaned = self.cleaned_cache(content)
+        if (not self.clean_processes or len(content) < self.PROCESS_MIN_BYTES
+                or (cleaned is not None and content in cleaned)):
+            result = self.clean_html(content)
+            return result, self.get_file_hash(result)
+
+        with self._lock:
+            if self.clean_pool is None:
+                self.clean_pool = create_clean_pool(self.clean_processes, self.sanitizer)
+        with self.metrics.timer('clean_html'):
+            result, digest, error, cpu = self.clean_pool.submit(_clean_and_hash, content).result()
+        self.metrics.inc('clean_offloaded')
+        # 子进程的CPU时间不计入本进程，单独累计
+        self.metrics.inc('clean_offloaded_cpu_seconds', cpu)
+        if error:
+            _print(f"    清理HTML失败: {error}")
+        elif cleaned is not None:
+            with self._lock:
+                cleaned[content] = result
+        return result, digest
+
     def compare_and_download(self, remote_path):
         """对比并下载文件"""
         url = f"{self.base_url}/{remote_path}" if remote_path else self.base_url
         file_icon = self.get_file_icon(remote_path or 'index.html')
         local_file = self.local_path / (remote_path or 'index.html')
 
-        remote_content = self.download_file(url)
-        if not remote_content:
-            print(f"  ❌ {file_icon} {remote_path or 'index.html'}")
-            self.stats['failed'] += 1
-            return False
-
-        text = remote_content.decode('utf-8', errors='ignore')
-        if '404' in text and 'Page Not Found' in text:
-            print(f"  ❌ {file_icon} {remote_path or 'index.html'} (404)")
-            self.stats['failed'] += 1
+        local_hash = file_hash = self.get_local_file_hash(local_file)
+        record = self.state.get(remote_path or 'index.html')
+        stored_hash = record.get('hash')
+        # 本地是无损重压缩后的图片时，视同优化前的远程内容
+        if local_hash is not None and local_hash == record.get('optimized'):
+            local_hash = stored_hash
+        validators = {}
+        if local_hash is not None and local_hash == stored_hash:
+            validators = self.conditional_headers(remote_path or 'index.html')
+
+        is_html = (remote_path or 'index.html').endswith(('.html', '.htm'))
+        part_file = None if is_html else self.resume_path(local_file)
+        offset = self.resume_offset(remote_path or 'index.html', part_file)
+        if offset:
+            # 字节范围针对未压缩的原始内容，续传时不协商压缩
+            validators = {'Range': f"bytes={offset}-", 'Accept-Encoding': 'identity',
+                          'If-Range': self.state.get(remote_path or 'index.html')['partial']}
+
+        response = self.open_url(url, validators)
+        if response is None:
+            if offset:
+                self.discard_partial(remote_path or 'index.html', part_file)
+            _print(f"  ❌ {file_icon} {remote_path or 'index.html'}")
+            self.count('failed')
             return False
 
-        if (remote_path or 'index.html').endswith(('.html', '.htm')):
-            remote_content = self.clean_html(remote_content)
-
-        remote_hash = self.get_file_hash(remote_content)
-        local_hash = self.get_local_file_hash(local_file)
-        stored_hash = self.file_hashes.get(remote_path or 'index.html')
-
-        if local_hash == remote_hash and stored_hash == remote_hash:
-            print(f"  ⏭️  {file_icon} {remote_path or 'index.html'} (未变化)")
-            self.stats['skipped'] += 1
-            return True
-
+        temp_file = None
         try:
-            local_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(local_file, 'wb') as f:
-                f.write(remote_content)
-
-            self.file_hashes[remote_path or 'index.html'] = remote_hash
+            with response:
+                if response.status == 304:
+                    self.metrics.inc('not_modified')
+                    self.record_validators(remote_path or 'index.html', response.headers, merge=True)
+                    if self.objects is not None:
+                        self.objects.adopt(file_hash, local_file)
+                    self.optimize_file(remote_path or 'index.html', local_file, stored_hash)
+                    _print(f"  ⏭️  {file_icon} {remote_path or 'index.html'} (未变化)")
+                    self.count('skipped')
+                    return True
+
+                self.metrics.inc('full_responses')
+                if is_html:
+                    remote_content = response.read()
+                    size = len(remote_content)
+                    is_404 = self.is_soft_404(response.headers, remote_content)
+                else:
+                    # 服务器忽略 Range 或 If-Range 校验失败时返回完整内容，从头写入
+                    if not self.range_matches(response, offset):
+                        offset = 0
+                        self.record_partial(remote_path or 'index.html', response.headers)
+                    remote_hash, size, is_404 = self.stream_to_part(response, part_file, offset)
+                    temp_file = part_file
+
+            if not size:
+                _print(f"  ❌ {file_icon} {remote_path or 'index.html'}")
+                self.count('failed')
+                return False
+
+            if is_404:
+                _print(f"  ❌ {file_icon} {remote_path or 'index.html'} (404)")
+                self.count('failed')
+                return False
+
+            if is_html:
+                remote_content, remote_hash = self.clean_and_hash(remote_content)
+
+            if local_hash == remote_hash and stored_hash == remote_hash:
+                self.record_validators(remote_path or 'index.html', response.headers, partial=None)
+                if self.objects is not None:
+                    self.objects.adopt(file_hash, local_file)
+                self.optimize_file(remote_path or 'index.html', local_file, remote_hash)
+                _print(f"  ⏭️  {file_icon} {remote_path or 'index.html'} (未变化)")
+                self.count('skipped')
+                return True
+
+            if local_hash != remote_hash:
+                self.install_file(local_file, remote_hash, remote_content if is_html else None, temp_file)
+                temp_file = None
+            elif self.objects is not None:
+                self.objects.adopt(file_hash, local_file)
+
+            # 文件落盘后再一次性提交哈希与校验值，避免校验值指向尚未写入的新版本
+            self.record_validators(remote_path or 'index.html', response.headers,
+                                   hash=remote_hash, partial=None)
+            self.optimize_file(remote_path or 'index.html', local_file, remote_hash,
+                               remote_content if is_html else None, force=local_hash != remote_hash)
 
             if local_hash is None:
-                print(f"  ✨ {file_icon} {remote_path or 'index.html'} (新文件)")
+                _print(f"  ✨ {file_icon} {remote_path or 'index.html'} (新文件)")
             else:
-                print(f"  🔄 {file_icon} {remote_path or 'index.html'} (已更新)")
+                _print(f"  🔄 {file_icon} {remote_path or 'index.html'} (已更新)")
 
-            self.stats['downloaded'] += 1
+            self.count('downloaded')
             return True
         except Exception as e:
-            print(f"  ❌ {file_icon} {remote_path or 'index.html'} - {e}")
-            self.stats['failed'] += 1
+            kept = self.keep_partial(remote_path or 'index.html', part_file) \
+                if part_file is not None and temp_file is None else 0
+            if kept:
+                _print(f"  ⏸️  {file_icon} {remote_path or 'index.html'} - {e} "
+                       f"(已保留 {kept} 字节，稍后续传)")
+                with self._lock:
+                    self.interrupted.append(remote_path)
+                return False
+            _print(f"  ❌ {file_icon} {remote_path or 'index.html'} - {e}")
+            self.count('failed')
             return False
+        finally:
+            if temp_file is not None:
+                temp_file.unlink(missing_ok=True)
 
     def get_file_icon(self, filename):
         if filename.endswith(('.html', '.htm')):
@@ -175,20 +1599,27 @@ class ProjectMirrorSync:
             return files
 
         for item in self.local_path.rglob('*'):
-            if item.is_file() and item.name != '.file_hashes.json':
+            if item.is_file() and not self.is_internal_file(item.name):
+                # 预压缩副本由本地生成，不是远程文件
+                if self.optimizer is not None and self.optimizer.is_variant(item.name):
+                    continue
                 rel_path = item.relative_to(self.local_path)
                 files.append(str(rel_path).replace('\\', '/'))
 
         return files
 
-    def sync_project(self, auto_detect=False):
+    def sync_project(self, auto_detect=False, paths=None):
         print(f"\n{'=' * 70}")
         print(f"🔄 开始同步项目")
         print(f"{'=' * 70}\n")
 
         self.stats = {'downloaded': 0, 'skipped': 0, 'failed': 0}
+        started = time.perf_counter()
 
-        if auto_detect and self.local_path.exists():
+        if paths is not None:
+            print(f"🎯 只同步变化的文件")
+            file_list = list(paths)
+        elif auto_detect and self.local_path.exists():
             print("🔍 自动检测本地文件...")
             file_list = self.scan_local_files()
             if file_list:
@@ -198,13 +1629,24 @@ class ProjectMirrorSync:
         else:
             file_list = ['']
 
+        if self.manifest and paths is None:
+            manifest_files = self.fetch_manifest()
+            if manifest_files is not None:
+                print(f"🗂️  清单 {self.manifest}: {len(manifest_files)} 个文件")
+                file_list = self.merge_paths(file_list, manifest_files)
+
         print(f"📋 文件总数: {len(file_list)}\n")
+        self.sync_files(file_list)
 
-        for i, file_path in enumerate(file_list, 1):
-            print(f"[{i:3d}/{len(file_list)}] ", end='')
-            self.compare_and_download(file_path)
+        if self.discover:
+            known = set(self.state.paths()) if paths is not None else set()
+            self.discover_and_sync(file_list, known)
 
-        self.save_hashes()
+        self.resume_interrupted()
+        if self.objects is not None:
+            self.collect_garbage()
+        elapsed = time.perf_counter() - started
+        self.metrics.observe('sync', elapsed)
 
         print(f"\n{'=' * 70}")
         print(f"✅ 同步完成")
@@ -213,20 +1655,178 @@ class ProjectMirrorSync:
         print(f"  ⏭️  未变化: {self.stats['skipped']} 个")
         if self.stats['failed'] > 0:
             print(f"  ❌ 失败: {self.stats['failed']} 个")
+        print(f"  ⏱️  耗时: {elapsed:.2f}秒")
         print(f"{'=' * 70}\n")
 
+    def resume_interrupted(self):
+        """本轮结束后对中断的下载做有限次数的续传，不阻塞其它文件的同步"""
+        for attempt in range(1, self.resume_attempts + 1):
+            pending, self.interrupted = self.interrupted, []
+            if not pending:
+                return
+            print(f"\n🔁 续传中断的文件 ({attempt}/{self.resume_attempts}): {len(pending)} 个\n")
+            time.sleep(attempt)
+            self.sync_files(pending)
+        # 仍未完成的部分文件保留在磁盘上，下一个检查周期继续续传
+        for _ in self.interrupted:
+            self.count('failed')
+        self.interrupted = []
+
+    def sync_files(self, file_list, done=0, total=None):
+        """对比下载一批文件，done/total 用于多轮发现时的连续编号"""
+        total = total or len(file_list)
+        if self.workers > 1 and len(file_list) > 1:
+            self.sync_concurrent(file_list, done, total)
+        elif self.quiet:
+            with _quiet_output():
+                for file_path in file_list:
+                    self.compare_and_download(file_path)
+        else:
+            for i, file_path in enumerate(file_list, done + 1):
+                print(f"[{i:3d}/{total}] ", end='')
+                self.compare_and_download(file_path)
+
+    def sync_concurrent(self, file_list, done=0, total=None):
+        """使用线程池并发对比下载，按文件列表顺序输出进度"""
+        total = total or len(file_list)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.compare_buffered, file_path) for file_path in file_list]
+            for i, future in enumerate(futures, done + 1):
+                output = future.result()
+                if not self.quiet:
+                    print(f"[{i:3d}/{total}] {output}", end='')
+
+    def discover_and_sync(self, file_list, known=()):
+        """从已同步的 HTML/CSS 中解析引用，逐轮发现并同步远程新增的文件"""
+        seen = {path or 'index.html' for path in file_list} | set(known)
+        done = len(file_list)
+        wave = file_list
+        while wave:
+            found = []
+            for path in wave:
+                for ref in self.extract_links(path):
+                    if ref not in seen:
+                        seen.add(ref)
+                        found.append(ref)
+            if not found:
+                break
+            print(f"\n🔗 发现 {len(found)} 个新引用的文件\n")
+            self.sync_files(found, done, done + len(found))
+            done += len(found)
+            wave = found
+
+    def extract_links(self, remote_path):
+        """解析本地 HTML/CSS 副本中的 href / src / url() 引用，返回站内相对路径"""
+        name = remote_path or 'index.html'
+        if not name.endswith(('.html', '.htm', '.css')):
+            return []
+        try:
+            text = (self.local_path / name).read_text(encoding='utf-8', errors='ignore')
+        except OSError:
+            return []
+
+        pattern = _CSS_REF if name.endswith('.css') else _HTML_REF
+        page_url = f"{self.base_url}/{remote_path}"
+        links = []
+        for match in pattern.finditer(text):
+            rel = self.relative_remote_path(urljoin(page_url, match.group(match.lastindex).strip()))
+            if rel is not None and rel not in links:
+                links.append(rel)
+        return links
+
+    def relative_remote_path(self, url):
+        """把站内URL转换为相对 base_url 的路径，站外链接返回 None"""
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            return None
+        url = parts._replace(query='', fragment='').geturl()
+        prefix = self.base_url + '/'
+        if not url.startswith(prefix):
+            return None
+        rel = unquote(url[len(prefix):])
+        if not rel or rel.endswith('/'):
+            rel += 'index.html'
+        if any(part in ('', '.', '..') for part in rel.split('/')) or self.is_internal_file(rel.rsplit('/', 1)[-1]):
+            return None
+        return rel
+
+    def fetch_manifest(self):
+        """下载远程清单（catalog.js 的 projects 数组或 JSON 文件列表），返回文件路径列表"""
+        result = self.fetch(f"{self.base_url}/{self.manifest}")
+        if not result:
+            print(f"   ⚠️  无法获取清单: {self.manifest}")
+            return None
+        self.record_validators(self.manifest, result[1])
+        text = result[2].decode('utf-8', errors='ignore')
+        manifest_url = f"{self.base_url}/{self.manifest}"
+
+        entries = []
+        if self.manifest.endswith('.json'):
+            try:
+                data = json.loads(text)
+            except ValueError as e:
+                print(f"   ⚠️  清单格式错误: {e}")
+                return None
+            if isinstance(data, dict):
+                data = data.get('files', data.get('projects', []))
+            for item in data:
+                if isinstance(item, str):
+                    entries.append(item)
+                elif isinstance(item, dict) and item.get('path'):
+                    entries.append(item['path'])
+                    base = item['path'].rsplit('/', 1)[0] + '/' if '/' in item['path'] else ''
+                    entries.extend(base + f for f in item.get('files', []))
+        else:
+            for match in _MANIFEST_PROJECT.finditer(text):
+                path = match.group(1)
+                entries.append(path)
+                base = path.rsplit('/', 1)[0] + '/' if '/' in path else ''
+                entries.extend(base + f for f in _QUOTED.findall(match.group(2)))
+
+        files = []
+        for entry in entries:
+            if entry.endswith('/'):
+                continue
+            rel = self.relative_remote_path(urljoin(manifest_url, entry))
+            if rel is not None and rel not in files:
+                files.append(rel)
+        return files
+
+    def merge_paths(self, file_list, extra):
+        """合并文件列表，'' 与 index.html 视为同一文件"""
+        seen = {path or 'index.html' for path in file_list}
+        merged = list(file_list)
+        for path in extra:
+            if path not in seen:
+                seen.add(path)
+                merged.append(path)
+        return merged
+
+    def compare_buffered(self, remote_path):
+        """在工作线程中执行对比下载，返回缓冲的输出内容"""
+        if self.quiet:
+            with _quiet_output():
+                self.compare_and_download(remote_path)
+            return ''
+        _output.buffer = io.StringIO()
+        try:
+            self.compare_and_download(remote_path)
+            return _output.buffer.getvalue()
+        finally:
+            _output.buffer = None
+
     def test_connection(self):
         print(f"\n🔍 测试连接...")
         test_url = f"{self.base_url}"
         print(f"   URL: {test_url}")
 
-        content = self.download_file(test_url)
+        result = self.fetch(test_url)
+        content = result[2] if result else None
         if not content:
             print(f"   ❌ 无法访问")
             return False
 
-        text = content.decode('utf-8', errors='ignore')
-        if '404' in text and 'Page Not Found' in text:
+        if self.is_soft_404(result[1], content):
             print(f"   ❌ 返回404")
             return False
 
@@ -245,24 +1845,35 @@ class ProjectMirrorSync:
         print(f"⏰ [{timestamp}] 检查更新")
         print(f"{'=' * 70}")
 
+        if self.probe and self.state.has_hashes():
+            return self.check_updates_probe()
+        return self.check_updates_index()
+
+    def check_updates_index(self):
+        """常规检查：下载首页，净化后与本地哈希比较，有变化时完整同步"""
         index_url = f"{self.base_url}"
-        remote_content = self.download_file(index_url)
+        local_file = self.local_path / 'index.html'
+        local_hash = self.get_local_file_hash(local_file)
+        validators = {}
+        if local_hash is not None and local_hash == self.state.get('index.html').get('hash'):
+            validators = self.conditional_headers('index.html')
+
+        result = self.fetch(index_url, validators)
+        if result and result[0] == 304:
+            print("✓ 无变化")
+            return False
 
+        remote_content = result[2] if result else None
         if not remote_content:
             print("❌ 无法访问")
-            return False
+            return None
 
-        text = remote_content.decode('utf-8', errors='ignore')
-        if '404' in text and 'Page Not Found' in text:
+        if self.is_soft_404(result[1], remote_content):
             print("❌ 返回404")
             print(f"💡 URL: {index_url}")
-            return False
-
-        cleaned_content = self.clean_html(remote_content)
-        remote_hash = self.get_file_hash(cleaned_content)
+            return None
 
-        local_file = self.local_path / 'index.html'
-        local_hash = self.get_local_file_hash(local_file)
+        remote_hash = self.clean_and_hash(remote_content)[1]
 
         if local_hash != remote_hash:
             print(f"✨ 检测到变化！")
@@ -280,12 +1891,89 @@ class ProjectMirrorSync:
             print("✓ 无变化")
             return False
 
+    def check_updates_probe(self):
+        """轻量探测：只对哨兵资源发送带校验值的 HEAD 请求，仅同步变化的文件
+
+        没有 ETag / Last-Modified 的资源无法用 HEAD 判断是否变化，存在这类资源时
+        退回常规首页检查，而不是把它们当作已变化。
+        """
+        targets = self.probe_targets()
+        sentinels = [path for path in targets if self.has_validators(path)]
+        unvalidated = len(targets) - len(sentinels)
+        changed, failed = self.probe_changes(sentinels)
+        if sentinels and failed == len(sentinels):
+            print("❌ 无法访问")
+            return None
+        if failed:
+            print(f"⚠️  {failed} 个哨兵探测失败")
+        if not changed:
+            if unvalidated:
+                print(f"ℹ️  {unvalidated} 个资源没有校验值，改用首页检查")
+                return self.check_updates_index()
+            print(f"✓ 无变化 (探测 {len(sentinels)} 个资源)")
+            return False
+
+        print(f"✨ 检测到变化: {len(changed)} 个文件")
+        self.backup()
+        if self.manifest in changed:
+            self.sync_project(auto_detect=True)
+        else:
+            self.sync_project(paths=changed)
+        return True
+
+    def probe_targets(self):
+        """探测目标：显式配置的哨兵；有清单时为清单与首页
+
+        两者都没有时为首页加一批轮换的已跟踪文件，每次只探测 PROBE_BATCH 个，
+        多次轮询后覆盖全站，单次轮询的开销不随文件数增长。
+        """
+        if self.sentinels:
+            return list(self.sentinels)
+        if self.manifest:
+            return [self.manifest, 'index.html']
+        paths = [path for path in self.state.paths() if path != 'index.html']
+        if not paths:
+            return ['index.html']
+        start = self._probe_cursor % len(paths)
+        batch = [paths[(start + i) % len(paths)] for i in range(min(self.PROBE_BATCH, len(paths)))]
+        self._probe_cursor = start + len(batch)
+        return ['index.html'] + batch
+
+    def has_validators(self, path):
+        meta = self.state.get(path)
+        return bool(meta.get('etag') or meta.get('last_modified'))
+
+    def probe_changes(self, paths):
+        """并发探测，返回 (变化的路径列表, 失败数)"""
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(self.probe_path, paths))
+        changed = [path for path, result in zip(paths, results) if result]
+        return changed, results.count(None)
+
+    def probe_path(self, path):
+        """HEAD 探测单个资源（需已记录校验值），返回是否变化，失败返回 None"""
+        meta = self.state.get(path)
+        url = f"{self.base_url}/{path}" if path != 'index.html' else self.base_url
+        headers = dict(self.HEADERS, **self.conditional_headers(path))
+        try:
+            with self.pool.request('HEAD', url, headers) as response:
+                if response.status == 304:
+                    return False
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+        except Exception as e:
+            _print(f"   探测失败 {path}: {str(e)[:50]}")
+            return None
+        if etag and meta.get('etag'):
+            return etag != meta['etag']
+        return last_modified != meta.get('last_modified')
+
     def backup(self):
         if not self.local_path.exists():
             return
 
         try:
-            has_content = any(item.name != '.file_hashes.json'
+            has_content = any(not self.is_internal_file(item.name)
                               for item in self.local_path.iterdir())
             if not has_content:
                 return
@@ -293,13 +1981,120 @@ class ProjectMirrorSync:
             return
 
         try:
-            backup_name = f"{self.local_path.name}_backup_{time.strftime('%Y%m%d_%H%M%S')}"
-            backup_path = self.local_path.parent / backup_name
+            previous = self.list_backups()
+            backup_path = self.new_backup_path()
+            backup_name = backup_path.name
             print(f"\n💾 备份: {backup_name}")
-            shutil.copytree(self.local_path, backup_path,
-                            ignore=shutil.ignore_patterns('.file_hashes.json'))
+            if self.backup_mode == 'incremental':
+                linked, copied = self.snapshot(backup_path, previous[-1] if previous else None)
+                print(f"   增量快照: 硬链接 {linked} 个, 复制 {copied} 个")
+            elif self.objects is not None:
+                linked, copied = self.snapshot(backup_path, None)
+                print(f"   快照: 链接对象库 {linked} 个, 复制 {copied} 个")
+            else:
+                shutil.copytree(self.local_path, backup_path, dirs_exist_ok=True,
+                                ignore=shutil.ignore_patterns(*self.STATE_FILES, self.PARTIAL_PATTERN))
         except Exception as e:
             print(f"   备份失败: {e}")
+            return
+
+        self.prune_backups()
+
+    def new_backup_path(self):
+        """创建并返回新的备份目录；同一秒内的多次备份依次加 .1、.2 … 后缀，绝不复用已有目录"""
+        stamp = f"{self.local_path.name}_backup_{time.strftime('%Y%m%d_%H%M%S')}"
+        counter = 0
+        while True:
+            backup_path = self.local_path.parent / (f"{stamp}.{counter}" if counter else stamp)
+            try:
+                backup_path.mkdir()
+                return backup_path
+            except FileExistsError:
+                counter += 1
+
+    def list_backups(self):
+        """按时间顺序列出已有的备份目录"""
+        prefix = f"{self.local_path.name}_backup_"
+        pattern = glob.escape(str(self.local_path.parent / prefix)) + '*'
+
+        def order(path):
+            stamp, _, counter = path.name[len(prefix):].partition('.')
+            return stamp, int(counter) if counter.isdigit() else 0
+
+        return sorted((Path(path) for path in glob.glob(pattern) if os.path.isdir(path)), key=order)
+
+    def snapshot(self, backup_path, previous):
+        """增量快照（类似 rsync --link-dest）：对象库中的文件与未变化的文件使用硬链接，只复制其余文件"""
+        linked = copied = 0
+        for root, dirs, files in os.walk(self.local_path):
+            rel_dir = Path(root).relative_to(self.local_path)
+            (backup_path / rel_dir).mkdir(parents=True, exist_ok=True)
+            for name in files:
+                if self.is_internal_file(name):
+                    continue
+                source = Path(root) / name
+                target = backup_path / rel_dir / name
+                if self.in_object_store(source):
+                    try:
+                        os.link(source, target)
+                        linked += 1
+                        continue
+                    except OSError:
+                        pass
+                if previous is not None and self.same_stat(source, previous / rel_dir / name):
+                    try:
+                        os.link(previous / rel_dir / name, target)
+                        linked += 1
+                        continue
+                    except OSError:
+                        pass
+                self.copy_file(source, target)
+                copied += 1
+        return linked, copied
+
+    def copy_file(self, source, target):
+        """复制到临时文件再原子替换；target 可能是对象库或旧快照的硬链接，不能原地写入"""
+        temp_file = self.temp_path(target)
+        try:
+            shutil.copy2(source, temp_file)
+            os.replace(temp_file, target)
+        except:
+            temp_file.unlink(missing_ok=True)
+            raise
+
+    def in_object_store(self, path):
+        """镜像文件是否为对象库中对象的硬链接"""
+        if self.objects is None:
+            return False
+        record = self.state.get(self.meta_key(path))
+        # 重压缩过的图片以优化后的内容哈希存入对象库
+        digest = record.get('optimized') or record.get('hash')
+        return bool(digest) and self.objects.contains(digest, path)
+
+    def collect_garbage(self):
+        """回收对象库中已不被镜像或备份引用的对象"""
+        removed, freed = self.objects.gc()
+        if removed:
+            print(f"🧹 对象库回收: {removed} 个对象, {freed // 1024} KB")
+
+    def same_stat(self, source, candidate):
+        """大小与修改时间一致即视为未变化（copy2 会保留修改时间）"""
+        try:
+            a, b = source.stat(), candidate.stat()
+        except OSError:
+            return False
+        return a.st_size == b.st_size and a.st_mtime_ns == b.st_mtime_ns
+
+    def prune_backups(self):
+        """只保留最近 backup_keep 个备份，0 表示全部保留"""
+        if not self.backup_keep:
+            return
+        for old in self.list_backups()[:-self.backup_keep]:
+            try:
+                shutil.rmtree(old)
+                print(f"   🗑️  清理旧备份: {old.name}")
+            except Exception as e:
+                print(f"   清理备份失败: {e}")
 
     def start(self):
         print("\n" + "=" * 70)
@@ -307,24 +2102,32 @@ class ProjectMirrorSync:
         print("=" * 70)
         print(f"📡 远程: {self.base_url}")
         print(f"💾 本地: {self.local_path}")
-        print(f"⏱️  间隔: {self.check_interval}秒")
+        if self.scheduler.adaptive:
+            print(f"⏱️  间隔: {self.scheduler.min_interval}-{self.scheduler.max_interval}秒 (自适应)")
+        else:
+            print(f"⏱️  间隔: {self.check_interval}秒")
         print(f"🧹 自动清理LiveReload等注入脚本")
         print(f"⌨️  Ctrl+C 停止")
         print("=" * 70)
 
-        if not self.test_connection():
-            print("\n❌ 连接失败，请检查URL是否正确")
-            return
+        # 连接测试与首次检查在同一周期内，首页只下载和净化一次
+        with self.request_cycle():
+            if not self.test_connection():
+                print("\n❌ 连接失败，请检查URL是否正确")
+                return
 
-        print("\n🔍 首次同步...")
-        self.check_updates()
+            server = self.metrics.serve(self.metrics_port) if self.metrics_port else None
+            print("\n🔍 首次同步...")
+            delay = self.scheduler.next_delay(self.run_check())
 
         print(f"\n👀 开始监控...\n")
 
         while True:
             try:
-                time.sleep(self.check_interval)
-                self.check_updates()
+                if self.scheduler.adaptive or self.scheduler.failures:
+                    print(f"⏳ {delay:.0f}秒后再次检查")
+                time.sleep(delay)
+                result = self.run_check()
             except KeyboardInterrupt:
                 print("\n\n" + "=" * 70)
                 print("👋 已停止")
@@ -333,15 +2136,343 @@ class ProjectMirrorSync:
             except Exception as e:
                 print(f"\n❌ 错误: {e}")
                 print("⏳ 继续监控...\n")
+                result = None
+            delay = self.scheduler.next_delay(result)
+
+        if server is not None:
+            server.shutdown()
+        self.close()
+
+    def close(self):
+        """释放连接池、状态库与自建的进程池"""
+        self.pool.close()
+        self.state.close()
+        if self.clean_pool is not None and self._owns_clean_pool:
+            self.clean_pool.shutdown()
+            self.clean_pool = None
+
+    def run_check(self):
+        """执行一次检查，记录耗时与结果并导出指标"""
+        with self.metrics.timer('check'), self.request_cycle():
+            result = self.check_updates()
+        self.metrics.inc({True: 'checks_changed', False: 'checks_unchanged', None: 'checks_failed'}[result])
+        self.metrics.export(self.metrics_file, self.prometheus_file)
+        return result
+
+
+# ============================================================================
+# 多镜像守护进程
+# ============================================================================
+
+class _ThreadStdout:
+    """按线程路由标准输出：设置了输出缓冲区的线程写入缓冲区，其余写入原始输出"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        buffer = getattr(_output, 'buffer', None)
+        return (self.stream if buffer is None else buffer).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class MirrorDaemon:
+    """多镜像守护进程 - 单进程调度多个同步目标，共享连接池与全局并发上限"""
+
+    def __init__(self, mirrors, defaults=None, max_concurrent=4, max_total=16,
+                 status_file='mirror_status.json'):
+        defaults = defaults or {}
+        self.metrics = Metrics()
+        # 所有镜像共用一个净化进程池，进程数不随镜像数量增长
+        self.clean_pool = (create_clean_pool(defaults['clean_processes'])
+                           if defaults.get('clean_processes') else None)
+        self.metrics_port = defaults.get('metrics_port')
+        self.pool = ConnectionPool(pool_size=defaults.get('pool_size', 4),
+                                   idle_timeout=defaults.get('idle_timeout', 30),
+                                   max_per_host=defaults.get('max_per_host', 4),
+                                   max_total=max_total, metrics=self.metrics)
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.status_file = Path(status_file)
+        self.syncers = []
+        self.status = {}
+        for mirror in mirrors:
+            options = dict(sync_options(defaults), **sync_options(mirror))
+            syncer = ProjectMirrorSync(mirror['remote_url'], mirror['local_path'],
+                                       mirror.get('check_interval', defaults.get('check_interval', 60)),
+                                       pool=self.pool, clean_pool=self.clean_pool, **options)
+            name = mirror.get('name') or syncer.local_path.name
+            self.syncers.append((name, syncer))
+            self.status[name] = {
+                'remote_url': syncer.base_url,
+                'local_path': str(syncer.local_path),
+                'state': 'pending',
+                'checks': 0,
+                'changes': 0,
+                'failures': 0,
+                'last_check': None,
+                'last_result': None,
+                'last_error': None,
+                'next_check': None,
+                'interval': syncer.scheduler.interval,
+            }
+        self._due = []
+        self._cond = threading.Condition()
+        self._status_lock = threading.Lock()
+        self._print_lock = threading.Lock()
+
+    def run(self):
+        print("\n" + "=" * 70)
+        print(f"🚀 多镜像守护进程: {len(self.syncers)} 个镜像")
+        print("=" * 70)
+        for name, syncer in self.syncers:
+            print(f"  📦 {name}: {syncer.base_url} → {syncer.local_path}")
+        print(f"⚙️  并发镜像: {self.max_concurrent}  📊 状态文件: {self.status_file}")
+        print(f"⌨️  Ctrl+C 停止")
+        print("=" * 70)
+
+        server = self.metrics.serve(self.metrics_port) if self.metrics_port else None
+        stdout, sys.stdout = sys.stdout, _ThreadStdout(sys.stdout)
+        self.write_status()
+        now = time.monotonic()
+        self._due = [(now, index) for index in range(len(self.syncers))]
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrent)
+        try:
+            while True:
+                executor.submit(self.check_mirror, self.next_due())
+        except KeyboardInterrupt:
+            print("\n\n" + "=" * 70)
+            print("👋 已停止")
+            print("=" * 70)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            sys.stdout = stdout
+            self.write_status()
+            if server is not None:
+                server.shutdown()
+            for _, syncer in self.syncers:
+                syncer.close()
+            if self.clean_pool is not None:
+                self.clean_pool.shutdown()
+
+    def next_due(self):
+        """阻塞直到有镜像到期，返回其序号"""
+        with self._cond:
+            while True:
+                if self._due:
+                    wait = self._due[0][0] - time.monotonic()
+                    if wait <= 0:
+                        return heapq.heappop(self._due)[1]
+                else:
+                    wait = None
+                self._cond.wait(wait)
+
+    def check_mirror(self, index):
+        """在工作线程中检查一个镜像，输出整体缓冲后统一打印，并安排下次检查"""
+        name, syncer = self.syncers[index]
+        self.update_status(name, state='running')
+        _output.buffer = io.StringIO()
+        error = None
+        try:
+            result = syncer.run_check()
+        except Exception as e:
+            result, error = None, str(e)
+            print(f"\n❌ 错误: {e}")
+        finally:
+            output, _output.buffer = _output.buffer.getvalue(), None
+
+        delay = syncer.scheduler.next_delay(result)
+        with self._print_lock:
+            print(f"\n📦 [{name}]{output}", end='')
+        status = self.status[name]
+        self.update_status(
+            name, state='idle', checks=status['checks'] + 1,
+            changes=status['changes'] + (1 if result else 0),
+            failures=syncer.scheduler.failures,
+            last_check=time.strftime('%Y-%m-%d %H:%M:%S'),
+            last_result={True: 'changed', False: 'unchanged', None: 'failed'}[result],
+            last_error=error, interval=syncer.scheduler.interval,
+            next_check=time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time() + delay)),
+            stats=dict(syncer.stats))
+
+        with self._cond:
+            heapq.heappush(self._due, (time.monotonic() + delay, index))
+            self._cond.notify()
+
+    def update_status(self, name, **fields):
+        with self._status_lock:
+            self.status[name].update(fields)
+        self.write_status()
+
+    def write_status(self):
+        """原子写入所有镜像的状态，供外部监控读取"""
+        with self._status_lock:
+            content = json.dumps({'updated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                                  'mirrors': self.status}, indent=2, ensure_ascii=False)
+            temp = self.status_file.with_name(f".{self.status_file.name}.tmp")
+            try:
+                temp.write_text(content, encoding='utf-8')
+                os.replace(temp, self.status_file)
+            except Exception as e:
+                print(f"⚠️  写入状态文件失败: {e}")
+
+
+# ============================================================================
+# 镜像静态服务
+# ============================================================================
+
+class PrecompressedHandler(SimpleHTTPRequestHandler):
+    """镜像静态服务 - 客户端支持时直接返回 .br/.gz 预压缩副本，带强 ETag 并支持条件请求"""
+
+    protocol_version = 'HTTP/1.1'
+    ETAG_CACHE_SIZE = 4096
+    _etags = {}
+    _etags_lock = threading.Lock()
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            # 缺少结尾斜杠的重定向与目录列表沿用默认实现
+            if not urlsplit(self.path).path.endswith('/'):
+                return super().send_head()
+            for index in ('index.html', 'index.htm'):
+                if os.path.isfile(os.path.join(path, index)):
+                    path = os.path.join(path, index)
+                    break
+            else:
+                return super().send_head()
+
+        name = os.path.basename(path)
+        if name in StateStore.FILES or fnmatch.fnmatch(name, ProjectMirrorSync.PARTIAL_PATTERN):
+            self.send_error(404, "File not found")
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+
+        served, served_st, encoding = path, st, None
+        negotiable = AssetOptimizer.precompressible(name)
+        if negotiable:
+            accepted = self.accepted_encodings()
+            for candidate, suffix in AssetOptimizer.VARIANTS:
+                if candidate not in accepted:
+                    continue
+                try:
+                    variant_st = os.stat(path + suffix)
+                except OSError:
+                    continue
+                # 比原文件旧的副本已过期（原文件更新后尚未重新生成）
+                if variant_st.st_mtime_ns >= st.st_mtime_ns:
+                    served, served_st, encoding = path + suffix, variant_st, candidate
+                    break
+
+        etag = self.strong_etag(served, served_st)
+        if self.etag_matches(etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            if negotiable:
+                self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return None
+
+        try:
+            f = open(served, 'rb')
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+        self.send_response(200)
+        self.send_header('Content-Type', self.guess_type(path))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if negotiable:
+            self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Content-Length', str(served_st.st_size))
+        self.send_header('Last-Modified', self.date_time_string(st.st_mtime))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        return f
+
+    def accepted_encodings(self):
+        """解析 Accept-Encoding，忽略 q=0 的编码"""
+        accepted = set()
+        for item in self.headers.get('Accept-Encoding', '').split(','):
+            token, _, params = item.partition(';')
+            match = re.search(r'q\s*=\s*([0-9.]+)', params)
+            try:
+                if match and float(match.group(1)) <= 0:
+                    continue
+            except ValueError:
+                continue
+            accepted.add(token.strip().lower())
+        return accepted
+
+    def strong_etag(self, path, st):
+        """按实际发送的字节计算的 ETag，不同编码的副本各不相同；按 stat 缓存避免重复读取"""
+        key = (path, st.st_size, st.st_mtime_ns, st.st_ino)
+        with self._etags_lock:
+            etag = self._etags.get(key)
+        if etag is None:
+            digest = hashlib.md5()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(64 * 1024), b''):
+                    digest.update(chunk)
+            etag = f'"{digest.hexdigest()}"'
+            with self._etags_lock:
+                if len(self._etags) >= self.ETAG_CACHE_SIZE:
+                    self._etags.clear()
+                self._etags[key] = etag
+        return etag
+
+    def etag_matches(self, etag):
+        header = self.headers.get('If-None-Match')
+        if not header:
+            return False
+        tags = [tag.strip() for tag in header.split(',')]
+        return '*' in tags or etag in tags or f"W/{etag}" in tags
+
+    def log_message(self, format, *args):
+        _print(f"  🌐 {self.address_string()} {format % args}")
+
+
+def serve_mirror(directory, port=8000, bind=''):
+    """静态服务模式：直接提供镜像目录，优先返回同步时生成的预压缩副本"""
+    server = ThreadingHTTPServer((bind, int(port)), partial(PrecompressedHandler, directory=str(directory)))
+    print(f"🌐 镜像服务: http://{bind or '0.0.0.0'}:{server.server_port}/ ({directory})")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
 
 
 # ============================================================================
 # 配置管理函数
 # ============================================================================
 
-def load_config():
+# sync_config.json 中可选的同步器高级参数
+SYNC_OPTION_KEYS = ('workers', 'max_per_host', 'pool_size', 'idle_timeout',
+                    'backup_mode', 'backup_keep', 'discover', 'manifest', 'probe', 'sentinels',
+                    'min_interval', 'max_interval', 'decay', 'resume_attempts', 'object_store',
+                    'quiet', 'metrics_file', 'prometheus_file', 'metrics_port', 'clean_processes',
+                    'optimize')
+
+
+def sync_options(config):
+    """从配置中提取同步器高级参数"""
+    if not config:
+        return {}
+    return {key: config[key] for key in SYNC_OPTION_KEYS if key in config}
+
+
+def load_config(path='sync_config.json'):
     """从文件加载配置"""
-    config_file = Path('sync_config.json')
+    config_file = Path(path)
     if not config_file.exists():
         return None
 
@@ -408,170 +2539,203 @@ def get_user_input():
             print("❌ URL不能为空，请重新输入")
             continue
 
-            if not (remote_url.startswith('http://') or remote_url.startswith('https://')):
-                print("❌ URL必须以 http:// 或 https:// 开头")
-                continue
+        if not (remote_url.startswith('http://') or remote_url.startswith('https://')):
+            print("❌ URL必须以 http:// 或 https:// 开头")
+            continue
 
-            print(f"✓ 已设置: {remote_url}")
-            break
+        print(f"✓ 已设置: {remote_url}")
+        break
 
-        # 获取本地路径
-        print("\n💾 步骤 2/3: 本地保存路径")
-        print("=" * 70)
-        print("💡 提示:")
-        print("   - 绝对路径或相对路径")
-        print("   - Windows示例: D:\\Projects\\MyProject")
-        print("   - Linux/Mac示例: /home/user/projects/myproject")
-        print("   - 相对路径示例: ./downloads/project")
+    # 获取本地路径
+    print("\n💾 步骤 2/3: 本地保存路径")
+    print("=" * 70)
+    print("💡 提示:")
+    print("   - 绝对路径或相对路径")
+    print("   - Windows示例: D:\\Projects\\MyProject")
+    print("   - Linux/Mac示例: /home/user/projects/myproject")
+    print("   - 相对路径示例: ./downloads/project")
 
-        while True:
-            local_path = input("\n请输入本地路径: ").strip()
-            if not local_path:
-                print("❌ 路径不能为空，请重新输入")
-                continue
+    while True:
+        local_path = input("\n请输入本地路径: ").strip()
+        if not local_path:
+            print("❌ 路径不能为空，请重新输入")
+            continue
 
-            # 移除引号（如果用户复制路径时带了引号）
-            local_path = local_path.strip('"').strip("'")
+        # 移除引号（如果用户复制路径时带了引号）
+        local_path = local_path.strip('"').strip("'")
 
-            try:
-                path_obj = Path(local_path)
-                # 显示绝对路径
-                abs_path = path_obj.resolve()
-                print(f"✓ 绝对路径: {abs_path}")
-
-                # 如果路径不存在，询问是否创建
-                if not path_obj.exists():
-                    create = input(f"📁 路径不存在，是否创建? (Y/n): ").strip().lower()
-                    if create == 'n':
-                        print("❌ 已取消，请重新输入路径")
-                        continue
-                    try:
-                        path_obj.mkdir(parents=True, exist_ok=True)
-                        print(f"✓ 已创建目录: {abs_path}")
-                    except Exception as e:
-                        print(f"❌ 创建目录失败: {e}")
-                        continue
+        try:
+            path_obj = Path(local_path)
+            # 显示绝对路径
+            abs_path = path_obj.resolve()
+            print(f"✓ 绝对路径: {abs_path}")
+
+            # 如果路径不存在，询问是否创建
+            if not path_obj.exists():
+                create = input(f"📁 路径不存在，是否创建? (Y/n): ").strip().lower()
+                if create == 'n':
+                    print("❌ 已取消，请重新输入路径")
+                    continue
+                try:
+                    path_obj.mkdir(parents=True, exist_ok=True)
+                    print(f"✓ 已创建目录: {abs_path}")
+                except Exception as e:
+                    print(f"❌ 创建目录失败: {e}")
+                    continue
 
-                break
+            break
 
-            except Exception as e:
-                print(f"❌ 无效的路径: {e}")
-                continue
+        except Exception as e:
+            print(f"❌ 无效的路径: {e}")
+            continue
 
-        # 获取检查间隔
-        print("\n⏱️  步骤 3/3: 检查间隔设置")
-        print("=" * 70)
-        print("💡 提示:")
-        print("   - 单位：秒")
-        print("   - 建议: 30-300秒")
-        print("   - 默认: 60秒")
+    # 获取检查间隔
+    print("\n⏱️  步骤 3/3: 检查间隔设置")
+    print("=" * 70)
+    print("💡 提示:")
+    print("   - 单位：秒")
+    print("   - 建议: 30-300秒")
+    print("   - 默认: 60秒")
 
-        while True:
-            interval_input = input("\n请输入检查间隔 (直接回车使用默认60秒): ").strip()
+    while True:
+        interval_input = input("\n请输入检查间隔 (直接回车使用默认60秒): ").strip()
 
-            if not interval_input:
-                check_interval = 60
-                print(f"✓ 使用默认值: {check_interval}秒")
-                break
+        if not interval_input:
+            check_interval = 60
+            print(f"✓ 使用默认值: {check_interval}秒")
+            break
 
-            try:
-                check_interval = int(interval_input)
-                if check_interval < 5:
-                    print("❌ 间隔太短，最少5秒")
-                    continue
-                if check_interval > 3600:
-                    confirm = input(
-                        f"⚠️  间隔较长({check_interval}秒={check_interval // 60}分钟)，确认? (Y/n): ").strip().lower()
-                    if confirm == 'n':
-                        continue
-                print(f"✓ 已设置: {check_interval}秒")
-                break
-            except ValueError:
-                print("❌ 请输入有效的数字")
+        try:
+            check_interval = int(interval_input)
+            if check_interval < 5:
+                print("❌ 间隔太短，最少5秒")
                 continue
+            if check_interval > 3600:
+                confirm = input(
+                    f"⚠️  间隔较长({check_interval}秒={check_interval // 60}分钟)，确认? (Y/n): ").strip().lower()
+                if confirm == 'n':
+                    continue
+            print(f"✓ 已设置: {check_interval}秒")
+            break
+        except ValueError:
+            print("❌ 请输入有效的数字")
+            continue
 
-        return remote_url, local_path, check_interval
+    return remote_url, local_path, check_interval
 
-    # ============================================================================
-    # 主程序
-    # ============================================================================
+# ============================================================================
+# 主程序
+# ============================================================================
 
-    def main():
-        """主函数"""
-        print("\n" + "=" * 70)
-        print("🚀 项目镜像同步器启动")
-        print("=" * 70)
+def run_daemon(config_path, quiet=False):
+    """守护进程模式：按配置文件中的 mirrors 列表同时同步多个镜像"""
+    config = load_config(config_path)
+    if not config or not config.get('mirrors'):
+        print(f"❌ {config_path} 中没有 mirrors 配置")
+        return 1
+    if quiet:
+        config['quiet'] = True
+    daemon = MirrorDaemon(config['mirrors'], defaults=config,
+                          max_concurrent=config.get('max_concurrent', 4),
+                          max_total=config.get('max_total', 16),
+                          status_file=config.get('status_file', 'mirror_status.json'))
+    daemon.run()
+    return 0
+
+
+def main(quiet=False):
+    """主函数"""
+    print("\n" + "=" * 70)
+    print("🚀 项目镜像同步器启动")
+    print("=" * 70)
 
-        # 尝试加载已保存的配置
-        saved_config = load_config()
+    # 尝试加载已保存的配置
+    saved_config = load_config()
 
-        if saved_config:
-            print("\n📄 检测到已保存的配置:")
-            print("=" * 70)
-            print(f"📡 远程URL: {saved_config.get('remote_url')}")
-            print(f"💾 本地路径: {saved_config.get('local_path')}")
-            print(f"⏱️  检查间隔: {saved_config.get('check_interval')}秒")
-            if 'created_at' in saved_config:
-                print(f"📅 创建时间: {saved_config.get('created_at')}")
-            print("=" * 70)
+    if saved_config:
+        print("\n📄 检测到已保存的配置:")
+        print("=" * 70)
+        print(f"📡 远程URL: {saved_config.get('remote_url')}")
+        print(f"💾 本地路径: {saved_config.get('local_path')}")
+        print(f"⏱️  检查间隔: {saved_config.get('check_interval')}秒")
+        if 'created_at' in saved_config:
+            print(f"📅 创建时间: {saved_config.get('created_at')}")
+        print("=" * 70)
 
-            choice = input("\n使用已保存的配置? (Y/n/d=删除配置): ").strip().lower()
+        choice = input("\n使用已保存的配置? (Y/n/d=删除配置): ").strip().lower()
 
-            if choice == 'd':
-                try:
-                    Path('sync_config.json').unlink()
-                    print("✓ 配置已删除")
-                    remote_url, local_path, check_interval = get_user_input()
-                except Exception as e:
-                    print(f"❌ 删除配置失败: {e}")
-                    return
-            elif choice == 'n':
+        if choice == 'd':
+            try:
+                Path('sync_config.json').unlink()
+                print("✓ 配置已删除")
                 remote_url, local_path, check_interval = get_user_input()
-            else:
-                remote_url = saved_config.get('remote_url')
-                local_path = saved_config.get('local_path')
-                check_interval = saved_config.get('check_interval', 60)
-        else:
-            # 交互式输入
+            except Exception as e:
+                print(f"❌ 删除配置失败: {e}")
+                return
+        elif choice == 'n':
             remote_url, local_path, check_interval = get_user_input()
+        else:
+            remote_url = saved_config.get('remote_url')
+            local_path = saved_config.get('local_path')
+            check_interval = saved_config.get('check_interval', 60)
+    else:
+        # 交互式输入
+        remote_url, local_path, check_interval = get_user_input()
 
-            # 询问是否保存配置
-            save_choice = input("\n💾 是否保存此配置供下次使用? (Y/n): ").strip().lower()
-            if save_choice != 'n':
-                save_config(remote_url, local_path, check_interval)
+        # 询问是否保存配置
+        save_choice = input("\n💾 是否保存此配置供下次使用? (Y/n): ").strip().lower()
+        if save_choice != 'n':
+            save_config(remote_url, local_path, check_interval)
 
-        # 显示最终配置
-        display_config_summary(remote_url, local_path, check_interval)
+    # 显示最终配置
+    display_config_summary(remote_url, local_path, check_interval)
 
-        # 确认开始
-        try:
-            confirm = input("\n✅ 开始同步? (回车继续 / n取消): ").strip().lower()
-            if confirm == 'n':
-                print("\n👋 已取消")
-                return
-        except KeyboardInterrupt:
-            print("\n\n👋 已取消")
+    # 确认开始
+    try:
+        confirm = input("\n✅ 开始同步? (回车继续 / n取消): ").strip().lower()
+        if confirm == 'n':
+            print("\n👋 已取消")
             return
+    except KeyboardInterrupt:
+        print("\n\n👋 已取消")
+        return
 
-        # 创建同步器并启动
-        try:
-            syncer = ProjectMirrorSync(remote_url, local_path, check_interval)
-            syncer.start()
-        except KeyboardInterrupt:
-            print("\n\n👋 已停止")
-        except Exception as e:
-            print(f"\n❌ 运行错误: {e}")
-            import traceback
-            traceback.print_exc()
-
-    if __name__ == "__main__":
-        try:
-            main()
-        except KeyboardInterrupt:
-            print("\n\n👋 程序已退出")
+    # 创建同步器并启动
+    try:
+        options = sync_options(saved_config)
+        if quiet:
+            options['quiet'] = True
+        syncer = ProjectMirrorSync(remote_url, local_path, check_interval, **options)
+        syncer.start()
+    except KeyboardInterrupt:
+        print("\n\n👋 已停止")
+    except Exception as e:
+        print(f"\n❌ 运行错误: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='项目镜像同步器')
+    parser.add_argument('--daemon', action='store_true',
+                        help='守护进程模式：在一个进程中同步配置文件 mirrors 列表里的所有镜像')
+    parser.add_argument('--config', default='sync_config.json', help='守护进程模式使用的配置文件')
+    parser.add_argument('--quiet', action='store_true', help='不输出逐文件的同步进度')
+    parser.add_argument('--serve', metavar='DIR', help='静态服务模式：提供镜像目录，优先返回预压缩副本')
+    parser.add_argument('--port', type=int, default=8000, help='静态服务模式的端口')
+    parser.add_argument('--bind', default='', help='静态服务模式绑定的地址')
+    args = parser.parse_args()
+    try:
+        if args.serve:
+            serve_mirror(args.serve, args.port, args.bind)
             sys.exit(0)
-        except Exception as e:
-            print(f"\n❌ 致命错误: {e}")
-            import traceback
-            traceback.print_exc()
-            sys.exit(1)
\ No newline at end of file
+        if args.daemon:
+            sys.exit(run_daemon(args.config, args.quiet))
+        main(args.quiet)
+    except KeyboardInterrupt:
+        print("\n\n👋 程序已退出")
+        sys.exit(0)
+    except Exception as e:
+        print(f"\n❌ 致命错误: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
\ No newline at end of file
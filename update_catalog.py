@@ -0,0 +1,507 @@
+"""项目目录生成器 - 扫描项目目录并更新 catalog.js 中的项目配置
+
+扫描结果（每个目录的直接文件/子目录列表、入口页标题）保存在扫描缓存中。
+再次运行时只重新扫描发生变化的目录：在 git 仓库中以缓存记录的提交为基准，
+通过 git diff 得到改动路径；没有可用的基准提交时退回比较目录修改时间。
+
+同时在 catalog-data/ 下生成源码查看器使用的数据：
+    bundles/<项目ID>.json   每个项目一个源码包，打开项目只需一次请求
+    search-index.json       名称、描述与文件内容的倒排索引
+
+用法:
+    python3 update_catalog.py [--cache .catalog_cache.json] [--full]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+from pathlib import Path
+
+
+# 排除的目录
+EXCLUDE_DIRS = {'.git', '.github', 'node_modules', '__pycache__'}
+ENTRY_NAMES = ('index.html', '1.html', 'main.html')
+TITLE_PATTERN = re.compile(r'<title>([^<]+)</title>', re.IGNORECASE)
+PROJECTS_PATTERN = r'const projects = \[[\s\S]*?\];'
+
+# 源码查看器数据目录（位于仓库根目录，不参与项目扫描）
+DATA_DIR = 'catalog-data'
+SOURCE_EXTENSIONS = ('.html', '.css', '.js')
+# 超过该大小的文件不放进源码包，查看时单独请求
+BUNDLE_MAX_BYTES = 512 * 1024
+# 搜索词：ASCII 单词与连续的中文；过长的 ASCII 串（压缩代码、base64）不建索引
+TOKEN_PATTERN = re.compile(r'[a-z0-9_$]+|[\u4e00-\u9fff]+')
+MAX_TOKEN_LENGTH = 32
+
+# 图标映射
+ICON_MAP = {
+    'shop': '🛒',
+    'cart': '🛍️',
+    'grid': '📐',
+    'layout': '📐',
+    'css': '🎨',
+    'style': '🎨',
+}
+
+
+def source_language(name):
+    """与 simple-highlight.js 对应的语言名"""
+    if name.endswith('.css'):
+        return 'css'
+    if name.endswith('.js'):
+        return 'javascript'
+    return 'markup'
+
+
+def tokenize(text):
+    """切分搜索词：ASCII 按单词，中文按相邻两字（外加末字），与 catalog.js 中的实现一致"""
+    terms = set()
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token[0] < '\u4e00':
+            if len(token) <= MAX_TOKEN_LENGTH:
+                terms.add(token)
+        else:
+            terms.update(token[i:i + 2] for i in range(len(token) - 1))
+            terms.add(token[-1])
+    return terms
+
+
+def git(base_path, *args):
+    """在 base_path 下执行 git 命令，失败返回 None"""
+    try:
+        result = subprocess.run(['git', '-C', str(base_path), *args], capture_output=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout
+
+
+class CatalogScanner:
+    """带扫描缓存的项目扫描器
+
+    缓存以目录为单位记录 scandir 顺序的文件与子目录列表，项目的文件列表由缓存按
+    与 rglob('*') 相同的先序顺序拼出，未变化的目录不再访问磁盘。
+    """
+
+    CACHE_VERSION = 2
+
+    def __init__(self, base_path='.', cache_file='.catalog_cache.json'):
+        self.base_path = Path(base_path)
+        self.cache_file = Path(cache_file)
+        self.dirs = {}
+        self.titles = {}
+        self.bundles = {}
+        self.project_keys = {}
+        self.changed = None
+        self.commit = None
+        self.rescanned = 0
+        self.load_cache()
+
+    def load_cache(self):
+        """读取扫描缓存，版本不符或损坏时视为没有缓存"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get('version') != self.CACHE_VERSION:
+                return
+            self.dirs = cache['dirs']
+            self.titles = cache['titles']
+            self.bundles = cache['bundles']
+            self.commit = cache.get('commit')
+        except Exception:
+            self.dirs, self.titles, self.bundles, self.commit = {}, {}, {}, None
+
+    def save_cache(self):
+        """写入扫描缓存"""
+        cache = {'version': self.CACHE_VERSION, 'commit': self.commit,
+                 'dirs': self.dirs, 'titles': self.titles, 'bundles': self.bundles}
+        tmp_file = self.cache_file.with_name(self.cache_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(cache, ensure_ascii=False))
+        os.replace(tmp_file, self.cache_file)
+
+    # ------------------------------------------------------------------
+    # 变化检测
+    # ------------------------------------------------------------------
+
+    def changed_paths(self, head):
+        """返回自缓存提交以来改动的路径集合；无法基于 git 判断时返回 None"""
+        if not head or not self.commit or git(self.base_path, 'cat-file', '-e', self.commit) is None:
+            return None
+        # 对比缓存提交与工作区（含暂存区），再加上未跟踪的文件
+        diff = git(self.base_path, 'diff', '--name-only', '--no-renames', '--relative', '-z', self.commit)
+        untracked = git(self.base_path, 'ls-files', '--others', '--exclude-standard', '-z')
+        if diff is None or untracked is None:
+            return None
+        names = (diff + untracked).decode('utf-8', 'surrogateescape').split('\0')
+        return {name for name in names if name}
+
+    def dirty_dirs(self, changed):
+        """改动路径的所有上级目录都需要重新列出（可能新增或删除了子目录）"""
+        dirty = set()
+        for name in changed:
+            parent = Path(name).parent
+            while True:
+                key = parent.as_posix()
+                if key in dirty:
+                    break
+                dirty.add(key)
+                if key == '.':
+                    break
+                parent = parent.parent
+        return dirty
+
+    def stale_dirs(self):
+        """没有 git 基准时按目录修改时间找出需要重新列出的目录"""
+        stale = set()
+        for key, entry in self.dirs.items():
+            try:
+                if os.stat(self.base_path / key).st_mtime_ns != entry['mtime']:
+                    stale.add(key)
+            except OSError:
+                stale.add(key)
+        return stale
+
+    # ------------------------------------------------------------------
+    # 扫描
+    # ------------------------------------------------------------------
+
+    def scan_dir(self, key):
+        """列出一个目录的直接文件与子目录，新出现的子目录递归扫描"""
+        path = self.base_path / key
+        old = self.dirs.get(key)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with os.scandir(path) as scandir_it:
+                entries = list(scandir_it)
+        except OSError:
+            self.forget_dir(key)
+            return
+        self.rescanned += 1
+
+        files, subdirs = [], []
+        for entry in entries:
+            try:
+                if entry.is_dir() and not entry.is_symlink():
+                    if entry.name not in EXCLUDE_DIRS and not (key == '.' and entry.name == DATA_DIR):
+                        subdirs.append(entry.name)
+                elif entry.is_file():
+                    files.append(entry.name)
+            except OSError:
+                pass
+        self.dirs[key] = {'mtime': mtime, 'files': files, 'dirs': subdirs}
+
+        for name in (old or {}).get('dirs', ()):
+            if name not in subdirs:
+                self.forget_dir(self.child_key(key, name))
+        for name in subdirs:
+            child = self.child_key(key, name)
+            if child not in self.dirs:
+                self.scan_dir(child)
+
+    def forget_dir(self, key):
+        """从缓存中删除目录及其所有子目录"""
+        entry = self.dirs.pop(key, None)
+        for name in (entry or {}).get('dirs', ()):
+            self.forget_dir(self.child_key(key, name))
+
+    @staticmethod
+    def child_key(key, name):
+        return name if key == '.' else f"{key}/{name}"
+
+    def refresh(self, full=False):
+        """按变化更新缓存，返回用于判断标题是否过期的改动路径集合（None 表示比较文件状态）"""
+        head = git(self.base_path, 'rev-parse', 'HEAD')
+        head = head.decode().strip() if head else None
+        changed = None if full or not self.dirs else self.changed_paths(head)
+
+        if full or not self.dirs:
+            self.dirs, self.titles, self.bundles = {}, {}, {}
+            self.scan_dir('.')
+        else:
+            dirty = self.dirty_dirs(changed) if changed is not None else self.stale_dirs()
+            # 父目录先于子目录扫描，已删除的子树在父目录重新列出时整体移除
+            for key in sorted(dirty, key=lambda k: (k != '.', k.count('/'), k)):
+                if key in self.dirs or key == '.':
+                    self.scan_dir(key)
+        self.commit = head
+        return changed
+
+    # ------------------------------------------------------------------
+    # 项目生成
+    # ------------------------------------------------------------------
+
+    def iter_files(self, key, prefix=''):
+        """按 rglob('*') 的顺序逐个产出目录下的文件（相对该目录的路径）"""
+        entry = self.dirs.get(key)
+        if entry is None:
+            return
+        for name in entry['files']:
+            yield prefix + name
+        for name in entry['dirs']:
+            yield from self.iter_files(self.child_key(key, name), f"{prefix}{name}/")
+
+    def project_dirs(self):
+        """直接包含 HTML 文件的目录即项目目录（根目录的 index.html 是目录页面，不算）"""
+        result = []
+        for key, entry in self.dirs.items():
+            names = entry['files']
+            if key == '.':
+                names = [name for name in names if name != 'index.html']
+            if any(name.endswith('.html') for name in names):
+                result.append(key)
+        # 与按 Path 排序一致（逐级比较路径各部分），但不必构造 Path 对象
+        return sorted(result, key=lambda k: [] if k == '.' else k.split('/'))
+
+    def title(self, key, changed):
+        """读取入口页标题，缓存命中且文件未变时不重新打开"""
+        path = self.base_path / key
+        cached = self.titles.get(key)
+        # git 模式下未出现在改动列表中的文件直接使用缓存，无需 stat
+        if cached is not None and changed is not None and key not in changed:
+            return cached['title']
+        try:
+            st = os.stat(path)
+            signature = [st.st_mtime_ns, st.st_size]
+        except OSError:
+            self.titles.pop(key, None)
+            return None
+        if cached is not None and changed is None and cached['stat'] == signature:
+            return cached['title']
+
+        title = None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                title_match = TITLE_PATTERN.search(f.read())
+                if title_match:
+                    title = title_match.group(1).strip()
+        except Exception:
+            pass
+        self.titles[key] = {'stat': signature, 'title': title}
+        return title
+
+    def scan_projects(self, full=False):
+        """扫描项目目录，自动发现项目"""
+        changed = self.changed = self.refresh(full)
+        projects, title_keys = [], set()
+        self.project_keys = {}
+        for key in self.project_dirs():
+            rel_path = Path(key)
+
+            # 只需要前 10 个文件和第一个 HTML 文件，不必拼出完整文件列表
+            files, first_html = [], None
+            for file in self.iter_files(key):
+                if len(files) < 10:
+                    files.append(file)
+                if first_html is None and file.endswith('.html'):
+                    first_html = file
+                if len(files) >= 10 and first_html is not None:
+                    break
+
+            # 查找入口文件
+            direct_files = self.dirs[key]['files']
+            entry_file = None
+            for name in ENTRY_NAMES:
+                if name in direct_files:
+                    entry_file = str(rel_path / name)
+                    break
+            if not entry_file and first_html:
+                entry_file = str(rel_path / first_html)
+            if not entry_file:
+                continue
+
+            # 生成项目配置
+            project_id = str(rel_path).replace('\\', '/').replace('/', '-').replace('(', '').replace(')', '')
+            title_key = (rel_path / entry_file.split('/')[-1]).as_posix()
+            title_keys.add(title_key)
+            project_name = self.title(title_key, changed) or str(rel_path)
+
+            icon = '📦'
+            for keyword, emoji in ICON_MAP.items():
+                if keyword in project_id.lower() or keyword in project_name.lower():
+                    icon = emoji
+                    break
+
+            self.project_keys[project_id] = key
+            projects.append({
+                'id': project_id,
+                'name': project_name,
+                'description': f'项目目录: {rel_path}',
+                'icon': icon,
+                'path': entry_file.replace('\\', '/'),
+                'files': files  # 限制文件列表长度
+            })
+
+        # 清理已不再是入口页的标题缓存
+        self.titles = {k: v for k, v in self.titles.items() if k in title_keys}
+        return projects
+
+    # ------------------------------------------------------------------
+    # 源码包与搜索索引
+    # ------------------------------------------------------------------
+
+    def bundle_sources(self, project):
+        """源码查看器展示的文件：项目文件列表中的 HTML/CSS/JS"""
+        return [name for name in project['files'] if name.endswith(SOURCE_EXTENSIONS)]
+
+    def build_bundle(self, project, bundle_file):
+        """把项目的源码合并为一个 JSON，返回 (文件状态, 内容搜索词)
+
+        content 为所有文件依次拼接的文本，files 记录每个文件的 offset/length
+        （以 UTF-16 码元计，即 JavaScript 字符串下标），前端直接 substr 取出。
+        """
+        project_dir = self.base_path / self.project_keys[project['id']]
+        files, pieces, stats, terms = [], [], [], set()
+        offset = 0
+        for name in self.bundle_sources(project):
+            path = project_dir / name
+            try:
+                st = os.stat(path)
+                stats.append([st.st_mtime_ns, st.st_size])
+                if st.st_size > BUNDLE_MAX_BYTES:
+                    continue
+                with open(path, 'rb') as f:
+                    text = f.read().decode('utf-8', 'replace')
+            except OSError:
+                stats.append(None)
+                continue
+            length = len(text.encode('utf-16-le')) // 2
+            files.append({'name': name, 'language': source_language(name),
+                          'offset': offset, 'length': length})
+            pieces.append(text)
+            terms |= tokenize(text)
+            offset += length
+
+        bundle = {'id': project['id'], 'files': files, 'content': ''.join(pieces)}
+        tmp_file = bundle_file.with_name(bundle_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(bundle, ensure_ascii=False, separators=(',', ':')))
+        os.replace(tmp_file, bundle_file)
+        return stats, sorted(terms)
+
+    def bundle_stale(self, project, cached, bundle_file):
+        """源码包是否需要重新生成"""
+        sources = self.bundle_sources(project)
+        if cached is None or cached['files'] != sources or not bundle_file.exists():
+            return True
+        project_dir = self.project_keys[project['id']]
+        if self.changed is not None:
+            prefix = '' if project_dir == '.' else project_dir + '/'
+            return any(prefix + name in self.changed for name in sources)
+        for name, signature in zip(sources, cached['stats']):
+            try:
+                st = os.stat(self.base_path / project_dir / name)
+            except OSError:
+                return True
+            if signature != [st.st_mtime_ns, st.st_size]:
+                return True
+        return False
+
+    def write_data(self, projects, data_dir=DATA_DIR):
+        """生成各项目的源码包与全局搜索索引，只重建内容变化的源码包"""
+        data_dir = self.base_path / data_dir
+        bundle_dir = data_dir / 'bundles'
+        bundle_dir.mkdir(parents=True, exist_ok=True)
+
+        bundles, rebuilt = {}, 0
+        for project in projects:
+            bundle_file = bundle_dir / f"{project['id']}.json"
+            cached = self.bundles.get(project['id'])
+            if self.bundle_stale(project, cached, bundle_file):
+                stats, terms = self.build_bundle(project, bundle_file)
+                cached = {'files': self.bundle_sources(project), 'stats': stats, 'terms': terms}
+                rebuilt += 1
+            bundles[project['id']] = cached
+        self.bundles = bundles
+
+        # 删除已不存在项目的源码包
+        for entry in os.scandir(bundle_dir):
+            if entry.name.endswith('.json') and entry.name[:-5] not in bundles:
+                os.remove(entry.path)
+
+        # 倒排索引：terms 按字典序排列供前缀二分查找，postings 为项目序号列表
+        postings = {}
+        for number, project in enumerate(projects):
+            terms = tokenize(f"{project['name']} {project['description']} {project['id']}")
+            terms.update(bundles[project['id']]['terms'])
+            for term in terms:
+                postings.setdefault(term, []).append(number)
+        terms = sorted(postings)
+        index = {'version': 1, 'projects': [p['id'] for p in projects],
+                 'terms': terms, 'postings': [postings[term] for term in terms]}
+        content = json.dumps(index, ensure_ascii=False, separators=(',', ':'))
+        index_file = data_dir / 'search-index.json'
+        try:
+            with open(index_file, 'r', encoding='utf-8') as f:
+                unchanged = f.read() == content
+        except OSError:
+            unchanged = False
+        if not unchanged:
+            with open(index_file, 'w', encoding='utf-8') as f:
+                f.write(content)
+        return rebuilt
+
+
+def update_catalog_js(projects, catalog_file='catalog.js'):
+    """更新 catalog.js 文件"""
+    catalog_file = Path(catalog_file)
+
+    if not catalog_file.exists():
+        print("catalog.js not found")
+        return False
+
+    with open(catalog_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    # 生成新的项目配置
+    projects_json = json.dumps(projects, ensure_ascii=False, indent=4)
+
+    # 替换项目配置部分
+    new_config = f'const projects = {projects_json};'
+    new_content = re.sub(PROJECTS_PATTERN, lambda m: new_config, content)
+
+    if new_content != content:
+        with open(catalog_file, 'w', encoding='utf-8') as f:
+            f.write(new_content)
+        print(f"Updated catalog.js with {len(projects)} projects")
+        return True
+    else:
+        print("No changes needed")
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='扫描项目目录并更新 catalog.js')
+    parser.add_argument('--base', default='.', help='仓库根目录')
+    parser.add_argument('--cache', default='.catalog_cache.json', help='扫描缓存文件')
+    parser.add_argument('--catalog', default='catalog.js', help='要更新的 catalog.js')
+    parser.add_argument('--full', action='store_true', help='忽略缓存，完整扫描')
+    parser.add_argument('--no-data', action='store_true', help='不生成源码包与搜索索引')
+    args = parser.parse_args()
+
+    print("Scanning project directories...")
+    scanner = CatalogScanner(args.base, args.cache)
+    projects = scanner.scan_projects(full=args.full)
+    print(f"Rescanned {scanner.rescanned} of {len(scanner.dirs)} directories")
+
+    print(f"Found {len(projects)} projects:")
+    for p in projects:
+        print(f"  - {p['name']} ({p['id']})")
+
+    if projects:
+        if not args.no_data:
+            rebuilt = scanner.write_data(projects)
+            print(f"Rebuilt {rebuilt} of {len(projects)} source bundles")
+        changed = update_catalog_js(projects, args.catalog)
+        if changed:
+            print("\nCatalog updated successfully!")
+        else:
+            print("\nNo changes needed.")
+    else:
+        print("No projects found!")
+    scanner.save_cache()
+
+
+if __name__ == '__main__':
+    main()